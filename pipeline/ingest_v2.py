@@ -2,22 +2,40 @@
 ingest_v2.py — VLR CSV → SQLite ingestion pipeline (schema_v2)
 
 Walk the "VCT Events/" directory tree.
-For every match folder, parse each CSV subfolder and populate the DB.
+For every match folder, parse each CSV subfolder (or the match.json.gz
+bundle written by `--format bundle`) and populate the DB. Match folders
+written with `--format arrow` hold the parsed records already and are
+loaded as they are (needs pyarrow).
 
 Usage (run from project root or pipeline/ dir):
     python pipeline/ingest_v2.py                          # ingest all events
     python pipeline/ingest_v2.py --event "Valorant_Champions_2025"
     python pipeline/ingest_v2.py --match "NRG_vs_FNATIC_Playoffs-_Grand_Final"
     python pipeline/ingest_v2.py --db db/my_custom.db
+    python pipeline/ingest_v2.py --bulk                   # full re-ingest, one transaction per event
+    python pipeline/ingest_v2.py --bulk --jobs 4          # ... parsing match folders in 4 processes
+    python pipeline/ingest_v2.py --full                   # re-ingest files that have not changed too
+
+Files are fingerprinted (size, mtime, SHA-256) in raw_files; a re-run only
+reads the files whose size or mtime changed and only ingests the ones whose
+content did, so match folders that are already in the DB are skipped.
 """
 
+import io
 import os
 import re
 import csv
+import gzip
+import json
+import time
 import uuid
+import hashlib
 import sqlite3
 import argparse
 import logging
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
 
@@ -120,16 +138,71 @@ def parse_player_team_col(col: str):
 # DB setup
 # ============================================================
 
-def open_db(db_path: Path) -> sqlite3.Connection:
+# Bulk load (--bulk): a large page cache, memory-mapped reads, temp tables in
+# memory and no fsync per commit. Foreign keys are not enforced while loading;
+# finish_bulk() checks them once at the end instead.
+BULK_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",      # with WAL: fsync only at checkpoints
+    "PRAGMA cache_size = -262144",      # KiB, i.e. 256 MB
+    "PRAGMA mmap_size = 1073741824",    # 1 GB
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA foreign_keys = OFF",
+)
+
+
+# raw_files columns added after the first release, for DBs created before them
+RAW_FILE_COLUMNS = {
+    "size":         "INTEGER",
+    "mtime":        "REAL",
+    "content_hash": "TEXT",
+}
+
+
+def open_db(db_path: Path, bulk: bool = False) -> sqlite3.Connection:
     conn = sqlite3.connect(db_path)
     conn.execute("PRAGMA foreign_keys = ON")
     conn.execute("PRAGMA journal_mode = WAL")
     with open(SCHEMA_FILE) as f:
         conn.executescript(f.read())
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(raw_files)")}
+    for column, definition in RAW_FILE_COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE raw_files ADD COLUMN {column} {definition}")
+    if "content_hash" not in existing:
+        # Rows from before the fingerprints used make_id() file IDs; see raw_file_id()
+        conn.executemany(
+            "UPDATE OR REPLACE raw_files SET file_id=? WHERE file_id=?",
+            [(raw_file_id(match_id, folder, filename), file_id)
+             for file_id, match_id, folder, filename in
+             conn.execute("SELECT file_id, match_id, folder, filename FROM raw_files").fetchall()]
+        )
     conn.commit()
+    if bulk:
+        # After the schema, which turns foreign keys on again
+        for pragma in BULK_PRAGMAS:
+            conn.execute(pragma)
     return conn
 
 
+def finish_bulk(conn: sqlite3.Connection):
+    """After a bulk load: integrity and foreign key checks, then ANALYZE."""
+    conn.commit()
+    started = time.perf_counter()
+    problems = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+    if problems != ["ok"]:
+        for problem in problems:
+            log.error(f"  integrity_check: {problem}")
+    violations = conn.execute("PRAGMA foreign_key_check").fetchall()
+    for table, rowid, parent, _ in violations[:20]:
+        log.error(f"  Foreign key: {table} rowid {rowid} references a missing {parent} row")
+    if len(violations) > 20:
+        log.error(f"  ... {len(violations) - 20} more foreign key violations")
+    conn.execute("ANALYZE")
+    conn.commit()
+    log.info(f"Checked in {time.perf_counter() - started:.2f}s: integrity {'ok' if problems == ['ok'] else 'FAILED'}, "
+             f"{len(violations)} foreign key violations; statistics updated")
+
+
 # ============================================================
 # Normalisation helpers — get-or-create dimension records
 # ============================================================
@@ -141,6 +214,12 @@ class Normaliser:
         self._player_cache: dict[str, str] = {}   # "name|team_id" → player_id
         self._agent_cache:  dict[str, str] = {}   # name_lower → agent_id
 
+    def clear(self):
+        """Forgets the cached IDs, e.g. after rolling back the rows they point at."""
+        self._team_cache.clear()
+        self._player_cache.clear()
+        self._agent_cache.clear()
+
     # ---- Teams ----
 
     def team_id(self, name: str) -> str:
@@ -322,6 +401,105 @@ def map_number_from_economy_filename(filename: str) -> int | None:
     return int(m.group(1)) if m else None
 
 
+# ============================================================
+# Match tables: CSV files, bundle entries or typed records
+# ============================================================
+
+BUNDLE_NAME = "match.json.gz"   # one file per match, see scraper/sinks.py
+
+# Typed layout: <kind>.arrow (Arrow IPC) per match, holding the records
+# parse_table returns for every table of that kind plus a "file" column
+TYPED_SUFFIX    = ".arrow"
+TYPED_FILES_KEY = b"vlrscrape.files"    # schema metadata: JSON list of the table file names
+
+
+class BundleTable:
+    """A table from a match bundle; the CSV parsers read it like the file it replaces."""
+
+    def __init__(self, name: str, rows: list):
+        self.name = name
+        self.rows = rows
+
+    def open(self):
+        buf = io.StringIO(newline="")
+        csv.writer(buf).writerows(self.rows)
+        buf.seek(0)
+        return buf
+
+
+class TypedTable:
+    """A table from the typed layout: its records are already parsed."""
+
+    def __init__(self, name: str, records: list):
+        self.name = name
+        self.records = records
+
+
+def open_table(source):
+    """Opens a CSV file (Path) or a BundleTable for reading."""
+    if isinstance(source, BundleTable):
+        return source.open()
+    return open(source, newline="", encoding="utf-8")
+
+
+def load_typed_tables(match_dir: Path) -> dict:
+    """{subfolder: [TypedTable, ...]} from a match folder's .arrow files."""
+    import pyarrow as pa
+
+    tables = {}
+    for kind, folder in TABLE_KINDS.items():
+        path = match_dir / f"{kind}{TYPED_SUFFIX}"
+        if not path.exists():
+            continue
+        with pa.memory_map(str(path)) as source:
+            table = pa.ipc.open_file(source).read_all()
+        by_file = {name: [] for name in json.loads(table.schema.metadata[TYPED_FILES_KEY])}
+        for record in table.to_pylist():
+            name = record.pop("file")
+            if kind == "advanced_stats":
+                # parse_advanced_stats leaves out the columns a short row lacks
+                record = {k: v for k, v in record.items() if v is not None}
+            by_file[name].append(record)
+        tables.setdefault(folder, []).extend(TypedTable(name, records) for name, records in by_file.items())
+    return tables
+
+
+def match_tables(match_dir: Path, only: set | None = None) -> dict:
+    """
+    {subfolder: [table, ...]} for a match folder, each list sorted by file
+    name: its typed records if it has them, else the tables of its bundle,
+    else its CSV files (just those in `only`, if given).
+    """
+    tables = {}
+    bundle = match_dir / BUNDLE_NAME
+    if (match_dir / f"player_stats{TYPED_SUFFIX}").exists():
+        tables = load_typed_tables(match_dir)
+    elif bundle.exists():
+        with gzip.open(bundle, "rb") as f:
+            for path, rows in json.loads(f.read())["tables"].items():
+                folder, name = path.split("/", 1)
+                tables.setdefault(folder.lower(), []).append(BundleTable(name, rows))
+    else:
+        for d in match_dir.iterdir():
+            if d.is_dir():
+                tables[d.name.lower()] = [p for p in d.glob("*.csv") if only is None or p in only]
+    return {folder: sorted(files, key=lambda t: t.name) for folder, files in tables.items()}
+
+
+def source_files(match_dir: Path) -> list:
+    """The files match_tables() reads for a match folder."""
+    if (match_dir / f"player_stats{TYPED_SUFFIX}").exists():
+        return sorted(match_dir.glob(f"*{TYPED_SUFFIX}"))
+    if (match_dir / BUNDLE_NAME).exists():
+        return [match_dir / BUNDLE_NAME]
+    return sorted(p for d in match_dir.iterdir() if d.is_dir() for p in d.glob("*.csv"))
+
+
+def source_key(match_dir: Path, path: Path) -> tuple:
+    """(folder, filename) of a source file as raw_files records it; folder is '' for a match-level file."""
+    return ("" if path.parent == match_dir else path.parent.name.lower()), path.name
+
+
 # ============================================================
 # CSV parsers (one per data type)
 # ============================================================
@@ -336,7 +514,7 @@ def parse_player_stats(csv_path: Path):
       fk, fd, fk_fd_diff
     """
     try:
-        with open(csv_path, newline="", encoding="utf-8") as f:
+        with open_table(csv_path) as f:
             reader = csv.DictReader(f)
             for row in reader:
                 agents_raw = row.get("Agents", "").strip()
@@ -380,7 +558,7 @@ def parse_rounds(csv_path: Path):
     Yields dicts: map_name, round_number, score_after, winning_team, winning_side, win_method
     """
     try:
-        with open(csv_path, newline="", encoding="utf-8") as f:
+        with open_table(csv_path) as f:
             reader = csv.DictReader(f)
             for row in reader:
                 score = row.get("Score", "").strip().strip('"')
@@ -411,7 +589,7 @@ def parse_map_veto(csv_path: Path):
     bans, picks, deciders = [], [], []
     seen = set()   # deduplicate map names
     try:
-        with open(csv_path, newline="", encoding="utf-8") as f:
+        with open_table(csv_path) as f:
             reader = csv.DictReader(f)
             for row in reader:
                 map_name = row.get("map", "").strip().lower()
@@ -473,7 +651,7 @@ def parse_economy_summary(csv_path: Path):
 
     try:
         rows = []
-        with open(csv_path, newline="", encoding="utf-8") as f:
+        with open_table(csv_path) as f:
             for line in f:
                 # Replace tab sequences with commas for uniform splitting
                 cells = [re.sub(r"\s+", " ", c).strip() for c in next(csv.reader([line]))]
@@ -522,7 +700,7 @@ def parse_round_economy(csv_path: Path):
     Yields: {round_number, team_a, team_b, bank_a, tier_a, bank_b, tier_b}
     """
     try:
-        with open(csv_path, newline="", encoding="utf-8") as f:
+        with open_table(csv_path) as f:
             content = f.read()
 
         # Split into rows
@@ -592,7 +770,7 @@ def parse_advanced_stats(csv_path: Path):
     """
     COLS = ["mk2", "mk3", "mk4", "mk5", "c1v1", "c1v2", "c1v3", "c1v4", "c1v5", "econ", "pl", "de"]
     try:
-        with open(csv_path, newline="", encoding="utf-8") as f:
+        with open_table(csv_path) as f:
             rows = list(csv.reader(f))
 
         # Find header row (contains "2K")
@@ -633,7 +811,7 @@ def parse_kill_matrix(csv_path: Path, kill_type: str = "all"):
     Yields: {killer_name, killer_team, victim_name, victim_team, kills_count, kill_type}
     """
     try:
-        with open(csv_path, newline="", encoding="utf-8") as f:
+        with open_table(csv_path) as f:
             rows = list(csv.reader(f))
 
         if not rows:
@@ -679,6 +857,170 @@ def parse_kill_matrix(csv_path: Path, kill_type: str = "all"):
         log.warning(f"  parse_kill_matrix failed for {csv_path.name}: {e}")
 
 
+# ============================================================
+# Table kinds: which parser reads which table
+# ============================================================
+
+# kind -> match subfolder its tables are in
+TABLE_KINDS = {
+    "player_stats":    "player_stats",
+    "rounds":          "rounds",
+    "map_veto":        "map_veto",
+    "economy_summary": "economy",
+    "round_economy":   "economy",
+    "kill_matrix":     "performance",
+    "advanced_stats":  "performance",
+}
+
+# Kill matrix file name part -> kill_type
+KILL_TYPES = {
+    "All_Kills":   "all",
+    "First_Kills": "fk",
+    "Op_Kills":    "op",
+}
+
+TABLE_PARSERS = {
+    "player_stats":    parse_player_stats,
+    "rounds":          parse_rounds,
+    "map_veto":        parse_map_veto,
+    "economy_summary": parse_economy_summary,
+    "round_economy":   parse_round_economy,
+    "advanced_stats":  parse_advanced_stats,
+}
+
+
+def table_kind(folder: str, filename: str) -> str | None:
+    """The kind of a table from its subfolder and file name; None for tables ingest ignores."""
+    if folder == "player_stats":
+        return "player_stats"
+    if folder == "rounds" and filename.endswith("_rounds.csv"):
+        return "rounds"
+    if folder == "map_veto" and filename == "map_veto.csv":
+        return "map_veto"
+    if folder == "economy":
+        if "_rounds_economy" in filename:
+            return "round_economy"
+        if "_economy" in filename:
+            return "economy_summary"
+    if folder == "performance":
+        if any(key in filename for key in KILL_TYPES):
+            return "kill_matrix"
+        if "advanced_stats" in filename:
+            return "advanced_stats"
+    return None
+
+
+def parse_table(kind: str, source) -> list:
+    """Parses a CSV file or BundleTable of the given kind into records."""
+    if kind == "kill_matrix":
+        kill_type = next(value for key, value in KILL_TYPES.items() if key in source.name)
+        return list(parse_kill_matrix(source, kill_type))
+    return list(TABLE_PARSERS[kind](source))
+
+
+def table_records(source, kind: str) -> list:
+    """The records of a table, parsing it unless it comes from the typed layout."""
+    if isinstance(source, TypedTable):
+        return source.records
+    return parse_table(kind, source)
+
+
+def parse_match_dir(match_dir: Path, only: set | None = None) -> dict:
+    """
+    match_tables() with every table parsed up front: {subfolder: [TypedTable, ...]}.
+    Only reads files, so --jobs runs it in worker processes.
+    """
+    parsed = {}
+    for folder, tables in match_tables(match_dir, only).items():
+        parsed[folder] = []
+        for table in tables:
+            if not isinstance(table, TypedTable):
+                kind  = table_kind(folder, table.name)
+                table = TypedTable(table.name, parse_table(kind, table) if kind else [])
+            parsed[folder].append(table)
+    return parsed
+
+
+class MatchParser:
+    """
+    Parses the changed files of match folders for the writer, which asks for
+    them with get() in ingest order. `changes` is {match_dir: (fingerprints,
+    changed files)} from file_changes(), in that order; folders without
+    changed files are not parsed at all. With jobs > 1 the parsing runs in a
+    process pool (--jobs), at most `ahead` matches ahead of the writer.
+    """
+
+    def __init__(self, changes: dict, jobs: int = 1, ahead: int | None = None):
+        self.changes   = changes
+        self._executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+        self._pending  = iter([match_dir for match_dir, (_, changed) in changes.items() if changed])
+        self._queue    = deque()   # (match_dir, future) in writer order
+        self.waited    = 0.0       # seconds the writer spent waiting for a parse
+        if self._executor:
+            for _ in range(ahead or jobs * 4):
+                self._submit()
+
+    def _submit(self):
+        match_dir = next(self._pending, None)
+        if match_dir is not None:
+            only = self.changes[match_dir][1]
+            self._queue.append((match_dir, self._executor.submit(parse_match_dir, match_dir, only)))
+
+    def get(self, match_dir: Path) -> dict:
+        if self._executor is None:
+            return parse_match_dir(match_dir, self.changes[match_dir][1])
+        expected, future = self._queue.popleft()
+        self._submit()
+        if expected != match_dir:
+            raise RuntimeError(f"Parsed {expected.name} but the writer is at {match_dir.name}")
+        started = time.perf_counter()
+        try:
+            return future.result()
+        finally:
+            self.waited += time.perf_counter() - started
+
+    def close(self):
+        if self._executor:
+            self._executor.shutdown(cancel_futures=True)
+
+
+# ============================================================
+# Row batches: one executemany per statement per match
+# ============================================================
+
+class RowBatch:
+    """
+    The rows of one match, queued per statement and written with one
+    executemany each by flush(). A row put() under a key replaces the row
+    queued under the same key, so repeated updates of one record collapse
+    into the last one.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self._rows:  dict[str, list] = {}   # sql → [params, ...]
+        self._keyed: dict[str, dict] = {}   # sql → {key: params}
+
+    def add(self, sql: str, params: tuple):
+        self._rows.setdefault(sql, []).append(params)
+
+    def put(self, sql: str, key, params: tuple):
+        self._keyed.setdefault(sql, {})[key] = params
+
+    def flush(self) -> int:
+        """Writes the queued rows in the order their statements were first seen."""
+        written = 0
+        for sql, rows in self._rows.items():
+            self.conn.executemany(sql, rows)
+            written += len(rows)
+        for sql, rows in self._keyed.items():
+            self.conn.executemany(sql, rows.values())
+            written += len(rows)
+        self._rows.clear()
+        self._keyed.clear()
+        return written
+
+
 # ============================================================
 # DB insertion helpers
 # ============================================================
@@ -734,9 +1076,14 @@ def get_map_teams(conn, map_id: str):
     return (row[0], row[1]) if row else (None, None)
 
 
-def log_raw_file(conn, event_id, match_id, map_number, map_name, folder, filename, row_count=None, notes=None):
-    fid = make_id("file", match_id, folder, filename)
-    conn.execute(
+def raw_file_id(match_id, folder, filename) -> str:
+    """raw_files key. The file name is kept as is: make_id() would fold 'All Maps_x.csv' into 'All_Maps_x.csv'."""
+    return f"{make_id('file', match_id, folder)}/{filename}"
+
+
+def log_raw_file(batch, event_id, match_id, map_number, map_name, folder, filename, row_count=None, notes=None):
+    fid = raw_file_id(match_id, folder, filename)
+    batch.add(
         """INSERT OR REPLACE INTO raw_files
            (file_id, event_id, match_id, map_number, map_name, folder, filename, ingested_at, row_count, notes)
            VALUES(?,?,?,?,?,?,?,?,?,?)""",
@@ -745,13 +1092,56 @@ def log_raw_file(conn, event_id, match_id, map_number, map_name, folder, filenam
     )
 
 
+def file_changes(conn, match_id: str, match_dir: Path, full: bool = False) -> tuple:
+    """
+    Compares a match folder's source files with the fingerprints raw_files
+    holds from the last ingest. Returns ({path: (size, mtime, content_hash)}
+    to record, {paths to ingest}). A file whose size and mtime are unchanged
+    is not read; one with a new mtime but the same content is recorded again
+    but not ingested. With `full`, every file is ingested.
+    """
+    stored = {} if full else {
+        (folder, filename): (size, mtime, content_hash)
+        for folder, filename, size, mtime, content_hash in conn.execute(
+            """SELECT folder, filename, size, mtime, content_hash FROM raw_files
+               WHERE match_id=? AND content_hash IS NOT NULL""",
+            (match_id,)
+        )
+    }
+    fingerprints, changed = {}, set()
+    for path in source_files(match_dir):
+        stat  = path.stat()
+        known = stored.get(source_key(match_dir, path))
+        if known and known[:2] == (stat.st_size, stat.st_mtime):
+            continue
+        content_hash = hashlib.sha256(path.read_bytes()).hexdigest()
+        fingerprints[path] = (stat.st_size, stat.st_mtime, content_hash)
+        if not known or known[2] != content_hash:
+            changed.add(path)
+    return fingerprints, changed
+
+
+def record_fingerprints(batch, event_id, match_id, match_dir: Path, fingerprints: dict):
+    for path, (size, mtime, content_hash) in fingerprints.items():
+        folder, filename = source_key(match_dir, path)
+        batch.add(
+            """INSERT INTO raw_files
+               (file_id, event_id, match_id, folder, filename, ingested_at, size, mtime, content_hash)
+               VALUES(?,?,?,?,?,?,?,?,?)
+               ON CONFLICT(file_id) DO UPDATE SET
+                 size=excluded.size, mtime=excluded.mtime, content_hash=excluded.content_hash""",
+            (raw_file_id(match_id, folder, filename), event_id, match_id, folder, filename,
+             datetime.now(timezone.utc).isoformat(), size, mtime, content_hash)
+        )
+
+
 # ============================================================
 # Per-section ingest functions
 # ============================================================
 
-def ingest_player_stats(conn, norm, match_id, stats_dir: Path, event_id):
+def ingest_player_stats(conn, norm, batch, match_id, stats_files: list, event_id):
     """Process all CSVs in player_stats/."""
-    for csv_file in sorted(stats_dir.glob("*.csv")):
+    for csv_file in stats_files:
         if "All_Maps" in csv_file.name:
             # All_Maps: multi-agent rows; skip map-level inserts, use only for agent bridge on all-maps
             continue
@@ -760,23 +1150,23 @@ def ingest_player_stats(conn, norm, match_id, stats_dir: Path, event_id):
             log.warning(f"  Cannot infer map number from {csv_file.name}, skipping")
             continue
 
-        rows     = list(parse_player_stats(csv_file))
+        rows     = table_records(csv_file, "player_stats")
         if not rows:
             continue
 
         map_name = rows[0]["map_name"]
         map_id   = upsert_map(conn, match_id, map_num, map_name)
-        log_raw_file(conn, event_id, match_id, map_num, map_name,
+        log_raw_file(batch, event_id, match_id, map_num, map_name,
                      "player_stats", csv_file.name, len(rows))
 
         for r in rows:
             team_id   = norm.team_id(r["team_name"])
             player_id = norm.player_id(r["player_name"], team_id)
 
-            # Ensure player is linked to a team in current context
-            conn.execute(
+            # Ensure player is linked to a team in current context (last row wins)
+            batch.put(
                 "UPDATE players SET current_team_id=? WHERE player_id=?",
-                (team_id, player_id)
+                player_id, (team_id, player_id)
             )
 
             pms_id = make_id("pms", map_id, player_id, r["side"])
@@ -792,7 +1182,7 @@ def ingest_player_stats(conn, norm, match_id, stats_dir: Path, event_id):
             except Exception:
                 pass
 
-            conn.execute(
+            batch.add(
                 """INSERT OR REPLACE INTO player_map_stats
                    (pms_id, map_id, player_id, team_id, side, rating, acs, kills, deaths, assists,
                     kd_diff, kast, adr, hs_pct, fk, fd, fk_fd_diff)
@@ -809,18 +1199,20 @@ def ingest_player_stats(conn, norm, match_id, stats_dir: Path, event_id):
                 for agent_name in r["agents"]:
                     if agent_name:
                         agent_id = norm.agent_id(agent_name)
-                        conn.execute(
+                        batch.add(
                             "INSERT OR IGNORE INTO player_map_agents(map_id, player_id, agent_id) VALUES(?,?,?)",
                             (map_id, player_id, agent_id)
                         )
 
-    log.info(f"  ✓ player_stats ({stats_dir})")
+    log.info(f"  ✓ player_stats ({len(stats_files)} files)")
 
 
-def ingest_rounds(conn, norm, match_id, rounds_dir: Path, event_id):
+def ingest_rounds(conn, norm, batch, match_id, rounds_files: list, event_id):
     """Process all _rounds.csv files."""
-    for csv_file in sorted(rounds_dir.glob("*_rounds.csv")):
-        rows = list(parse_rounds(csv_file))
+    for csv_file in rounds_files:
+        if not csv_file.name.endswith("_rounds.csv"):
+            continue
+        rows = table_records(csv_file, "rounds")
         if not rows:
             continue
 
@@ -830,7 +1222,7 @@ def ingest_rounds(conn, norm, match_id, rounds_dir: Path, event_id):
             log.warning(f"  Map not found for rounds file {csv_file.name}, skipping")
             continue
 
-        log_raw_file(conn, event_id, match_id, None, map_name,
+        log_raw_file(batch, event_id, match_id, None, map_name,
                      "rounds", csv_file.name, len(rows))
 
         team_a_id, team_b_id = get_map_teams(conn, map_id)
@@ -846,7 +1238,7 @@ def ingest_rounds(conn, norm, match_id, rounds_dir: Path, event_id):
                 winning_team_id = norm.team_id(wteam_raw)
 
             round_id = make_id("round", map_id, r["round_number"])
-            conn.execute(
+            batch.add(
                 """INSERT OR REPLACE INTO rounds
                    (round_id, map_id, round_number, score_after, winning_team_id,
                     winning_side, win_method)
@@ -855,23 +1247,23 @@ def ingest_rounds(conn, norm, match_id, rounds_dir: Path, event_id):
                  winning_team_id, r["winning_side"], r["win_method"])
             )
 
-    log.info(f"  ✓ rounds ({rounds_dir})")
+    log.info(f"  ✓ rounds ({len(rounds_files)} files)")
 
 
-def ingest_map_veto(conn, norm, match_id, veto_dir: Path, event_id):
+def ingest_map_veto(conn, norm, batch, match_id, veto_files: list, event_id):
     """Process map_veto.csv."""
-    veto_file = veto_dir / "map_veto.csv"
-    if not veto_file.exists():
+    veto_file = next((f for f in veto_files if f.name == "map_veto.csv"), None)
+    if veto_file is None:
         return
 
-    entries = parse_map_veto(veto_file)
-    log_raw_file(conn, event_id, match_id, None, None,
+    entries = table_records(veto_file, "map_veto")
+    log_raw_file(batch, event_id, match_id, None, None,
                  "map_veto", veto_file.name, len(entries))
 
     for entry in entries:
         veto_id = make_id("veto", match_id, entry["order_no"])
         team_id = norm.team_id(entry["team_name"]) if entry.get("team_name") else None
-        conn.execute(
+        batch.add(
             """INSERT OR REPLACE INTO map_veto
                (veto_id, match_id, order_no, team_id, action_type, map_name)
                VALUES(?,?,?,?,?,?)""",
@@ -879,12 +1271,12 @@ def ingest_map_veto(conn, norm, match_id, veto_dir: Path, event_id):
              entry["action_type"], entry["map_name"])
         )
 
-    log.info(f"  ✓ map_veto ({veto_dir})")
+    log.info(f"  ✓ map_veto ({veto_file.name})")
 
 
-def ingest_economy(conn, norm, match_id, econ_dir: Path, event_id):
+def ingest_economy(conn, norm, batch, match_id, econ_files: list, event_id):
     """Process economy CSVs."""
-    for csv_file in sorted(econ_dir.glob("*.csv")):
+    for csv_file in econ_files:
         filename = csv_file.name
         map_num  = map_number_from_economy_filename(filename)
         if map_num is None:
@@ -910,8 +1302,8 @@ def ingest_economy(conn, norm, match_id, econ_dir: Path, event_id):
 
         if "_rounds_economy" in filename:
             # Round-by-round economy
-            rounds_econ = parse_round_economy(csv_file)
-            log_raw_file(conn, event_id, match_id, map_num, map_name,
+            rounds_econ = table_records(csv_file, "round_economy")
+            log_raw_file(batch, event_id, match_id, map_num, map_name,
                          "economy", filename, len(rounds_econ))
             for r in rounds_econ:
                 team_a_id = norm.team_id(r["team_a"])
@@ -921,7 +1313,7 @@ def ingest_economy(conn, norm, match_id, econ_dir: Path, event_id):
                     (team_b_id, r["bank_b"], r["tier_b"]),
                 ]:
                     econ_id = make_id("econ", map_id, r["round_number"], team_id)
-                    conn.execute(
+                    batch.add(
                         """INSERT OR REPLACE INTO round_economy
                            (econ_id, map_id, round_number, team_id, bank_start, buy_tier)
                            VALUES(?,?,?,?,?,?)""",
@@ -929,13 +1321,13 @@ def ingest_economy(conn, norm, match_id, econ_dir: Path, event_id):
                     )
         elif "_economy" in filename:
             # Summary table
-            rows = list(parse_economy_summary(csv_file))
-            log_raw_file(conn, event_id, match_id, map_num, map_name,
+            rows = table_records(csv_file, "economy_summary")
+            log_raw_file(batch, event_id, match_id, map_num, map_name,
                          "economy", filename, len(rows))
             for r in rows:
                 team_id = norm.team_id(r["team_name"])
                 mes_id  = make_id("mes", map_id, team_id, r["buy_type"])
-                conn.execute(
+                batch.add(
                     """INSERT OR REPLACE INTO map_economy_summary
                        (mes_id, map_id, team_id, buy_type, rounds_played, rounds_won)
                        VALUES(?,?,?,?,?,?)""",
@@ -943,24 +1335,18 @@ def ingest_economy(conn, norm, match_id, econ_dir: Path, event_id):
                      r["rounds_played"], r["rounds_won"])
                 )
 
-    log.info(f"  ✓ economy ({econ_dir})")
+    log.info(f"  ✓ economy ({len(econ_files)} files)")
 
 
-def ingest_performance(conn, norm, match_id, perf_dir: Path, event_id):
+def ingest_performance(conn, norm, batch, match_id, perf_files: list, event_id):
     """Process kill matrix and advanced stats CSVs."""
-    kill_type_map = {
-        "All_Kills":   "all",
-        "First_Kills": "fk",
-        "Op_Kills":    "op",
-    }
-
-    for csv_file in sorted(perf_dir.glob("*.csv")):
+    for csv_file in perf_files:
         filename = csv_file.name
         if "All_Maps" in filename:
             # All_Maps advanced stats
             if "advanced_stats" in filename:
-                rows = list(parse_advanced_stats(csv_file))
-                log_raw_file(conn, event_id, match_id, 0, "All_Maps",
+                rows = table_records(csv_file, "advanced_stats")
+                log_raw_file(batch, event_id, match_id, 0, "All_Maps",
                              "performance", filename, len(rows))
                 # We skip All_Maps advanced stats DB insert since we have no single map_id
                 # (could store in a separate all-match table — future enhancement)
@@ -984,10 +1370,10 @@ def ingest_performance(conn, norm, match_id, perf_dir: Path, event_id):
                 continue
 
         # Kill matrices
-        for ktype_key, ktype_val in kill_type_map.items():
+        for ktype_key, ktype_val in KILL_TYPES.items():
             if ktype_key in filename:
-                rows = list(parse_kill_matrix(csv_file, ktype_val))
-                log_raw_file(conn, event_id, match_id, map_num, map_name,
+                rows = table_records(csv_file, "kill_matrix")
+                log_raw_file(batch, event_id, match_id, map_num, map_name,
                              "performance", filename, len(rows))
                 for r in rows:
                     killer_team_id = norm.team_id(r["killer_team"]) if r["killer_team"] else None
@@ -995,7 +1381,7 @@ def ingest_performance(conn, norm, match_id, perf_dir: Path, event_id):
                     killer_id = norm.player_id(r["killer_name"], killer_team_id or "")
                     victim_id = norm.player_id(r["victim_name"], victim_team_id or "")
                     pvpk_id   = make_id("pvpk", map_id, killer_id, victim_id, ktype_val)
-                    conn.execute(
+                    batch.add(
                         """INSERT OR REPLACE INTO player_vs_player_kills
                            (pvpk_id, map_id, killer_player_id, victim_player_id,
                             killer_team_id, victim_team_id, kill_type, kills_count)
@@ -1007,14 +1393,14 @@ def ingest_performance(conn, norm, match_id, perf_dir: Path, event_id):
 
         # Advanced stats (per-map)
         if "advanced_stats" in filename:
-            rows = list(parse_advanced_stats(csv_file))
-            log_raw_file(conn, event_id, match_id, map_num, map_name,
+            rows = table_records(csv_file, "advanced_stats")
+            log_raw_file(batch, event_id, match_id, map_num, map_name,
                          "performance", filename, len(rows))
             for r in rows:
                 team_id   = norm.team_id(r["team_name"]) if r.get("team_name") else None
                 player_id = norm.player_id(r["player_name"], team_id or "")
                 pma_id    = make_id("pma", map_id, player_id)
-                conn.execute(
+                batch.add(
                     """INSERT OR REPLACE INTO player_map_advanced
                        (pma_id, map_id, player_id, team_id,
                         multikill_2, multikill_3, multikill_4, multikill_5,
@@ -1028,7 +1414,7 @@ def ingest_performance(conn, norm, match_id, perf_dir: Path, event_id):
                      r.get("econ"), r.get("pl", 0), r.get("de", 0))
                 )
 
-    log.info(f"  ✓ performance ({perf_dir})")
+    log.info(f"  ✓ performance ({len(perf_files)} files)")
 
 
 # ============================================================
@@ -1111,45 +1497,94 @@ def reconcile_match_teams(conn, norm, match_id: str, folder_team_a: str, folder_
             log.debug(f"  Removed orphan team: {folder_tid}")
 
 
-def ingest_match(conn, norm, match_dir: Path, event_id: str, stage: str):
-    match_info = parse_match_folder(match_dir, event_id, stage)
-    match_id, team_a_id, team_b_id = upsert_match(conn, norm, match_info, event_id)
-    log.info(f"  Match: {match_dir.name}  →  {match_id}")
+@contextmanager
+def match_savepoint(conn, norm):
+    """Runs one match's writes in a savepoint, so a failing match rolls back alone."""
+    conn.execute("SAVEPOINT match")
+    try:
+        yield
+    except BaseException:
+        conn.execute("ROLLBACK TO match")
+        conn.execute("RELEASE match")
+        norm.clear()   # cached IDs may point at rows that were just rolled back
+        raise
+    conn.execute("RELEASE match")
 
-    subfolders = {d.name.lower(): d for d in match_dir.iterdir() if d.is_dir()}
+
+def ingest_match_tables(conn, norm, batch, match_info: dict, event_id: str, subfolders: dict):
+    match_id, team_a_id, team_b_id = upsert_match(conn, norm, match_info, event_id)
+    log.info(f"  Match: {match_info['match_name']}  →  {match_id}")
 
     if "player_stats" in subfolders:
-        ingest_player_stats(conn, norm, match_id, subfolders["player_stats"], event_id)
+        ingest_player_stats(conn, norm, batch, match_id, subfolders["player_stats"], event_id)
+        batch.flush()   # reconcile reads the stats and the players' teams back
         # Reconcile folder team names (e.g. "FNATIC") with stat abbreviations (e.g. "FNC")
         reconcile_match_teams(conn, norm, match_id,
                               match_info["team_a_name"], match_info["team_b_name"])
     if "rounds" in subfolders:
-        ingest_rounds(conn, norm, match_id, subfolders["rounds"], event_id)
+        ingest_rounds(conn, norm, batch, match_id, subfolders["rounds"], event_id)
     if "map_veto" in subfolders:
-        ingest_map_veto(conn, norm, match_id, subfolders["map_veto"], event_id)
+        ingest_map_veto(conn, norm, batch, match_id, subfolders["map_veto"], event_id)
     if "economy" in subfolders:
-        ingest_economy(conn, norm, match_id, subfolders["economy"], event_id)
+        ingest_economy(conn, norm, batch, match_id, subfolders["economy"], event_id)
     if "performance" in subfolders:
-        ingest_performance(conn, norm, match_id, subfolders["performance"], event_id)
+        ingest_performance(conn, norm, batch, match_id, subfolders["performance"], event_id)
 
-    conn.commit()
+
+def ingest_match(conn, norm, match_dir: Path, event_id: str, stage: str, bulk: bool = False,
+                 parser: MatchParser | None = None):
+    """
+    Ingests one match folder; commits it unless in bulk mode, where the caller
+    commits. With a MatchParser only the files it found changed are ingested
+    (none: the match is skipped) and their fingerprints are recorded.
+    """
+    fingerprints, changed = parser.changes[match_dir] if parser else ({}, None)
+    with match_savepoint(conn, norm):
+        match_info = parse_match_folder(match_dir, event_id, stage)
+        batch = RowBatch(conn)
+        if changed is None:
+            ingest_match_tables(conn, norm, batch, match_info, event_id, match_tables(match_dir))
+        elif changed:
+            ingest_match_tables(conn, norm, batch, match_info, event_id, parser.get(match_dir))
+        else:
+            log.debug(f"  Unchanged: {match_dir.name}")
+        record_fingerprints(batch, event_id, match_info["match_id"], match_dir, fingerprints)
+        batch.flush()
+
+    if not bulk:
+        conn.commit()
+
+
+def stage_match_dirs(stage_dir: Path) -> list:
+    return [d for d in sorted(stage_dir.iterdir()) if d.is_dir() and "_vs_" in d.name]
+
+
+def event_match_dirs(event_dir: Path, match_filter: str | None = None) -> list:
+    """[(stage_dir, match_dir), ...] in ingest order, optionally only the matches named like match_filter."""
+    pairs = []
+    for stage_dir in sorted(event_dir.iterdir()):
+        if not stage_dir.is_dir():
+            continue
+        if match_filter:
+            match_dirs = [d for d in sorted(stage_dir.iterdir())
+                          if d.is_dir() and match_filter.lower() in d.name.lower()]
+        else:
+            match_dirs = stage_match_dirs(stage_dir)
+        pairs.extend((stage_dir, match_dir) for match_dir in match_dirs)
+    return pairs
 
 
-def ingest_stage(conn, norm, stage_dir: Path, event_id: str):
+def ingest_stage(conn, norm, stage_dir: Path, event_id: str, bulk: bool = False, parser=None):
     stage_name = stage_dir.name.replace("_", " ")
     log.info(f"Stage: {stage_name}")
-    for match_dir in sorted(stage_dir.iterdir()):
-        if not match_dir.is_dir():
-            continue
-        if "_vs_" not in match_dir.name:
-            continue
+    for match_dir in stage_match_dirs(stage_dir):
         try:
-            ingest_match(conn, norm, match_dir, event_id, stage_name)
+            ingest_match(conn, norm, match_dir, event_id, stage_name, bulk, parser)
         except Exception as e:
             log.error(f"  ERROR ingesting match {match_dir.name}: {e}", exc_info=True)
 
 
-def ingest_event(conn, norm, event_dir: Path):
+def ingest_event(conn, norm, event_dir: Path, bulk: bool = False, parser=None):
     event_info = parse_event_folder(event_dir)
     upsert_event(conn, norm, event_info)
     event_id = event_info["event_id"]
@@ -1157,7 +1592,7 @@ def ingest_event(conn, norm, event_dir: Path):
 
     for stage_dir in sorted(event_dir.iterdir()):
         if stage_dir.is_dir():
-            ingest_stage(conn, norm, stage_dir, event_id)
+            ingest_stage(conn, norm, stage_dir, event_id, bulk, parser)
 
     conn.commit()
 
@@ -1173,6 +1608,13 @@ def main():
     parser.add_argument("--event",   help="Filter to a specific event folder name")
     parser.add_argument("--match",   help="Filter to a specific match folder name")
     parser.add_argument("--year",    type=int, help="Filter to a specific year")
+    parser.add_argument("--bulk",    action="store_true",
+                        help="Bulk load: one transaction per event with a savepoint per match, tuned "
+                             "pragmas, foreign keys checked at the end, then an integrity check and ANALYZE")
+    parser.add_argument("--jobs",    type=int, default=1,
+                        help="Processes parsing match folders ahead of the single DB writer (default: 1, no pool)")
+    parser.add_argument("--full",    action="store_true",
+                        help="Ingest every file, not just those changed since the last ingest")
     args = parser.parse_args()
 
     db_path = Path(args.db)
@@ -1180,41 +1622,60 @@ def main():
 
     log.info(f"DB:   {db_path}")
     log.info(f"Root: {events_root}")
+    started = time.perf_counter()
 
-    conn = open_db(db_path)
+    conn = open_db(db_path, args.bulk)
     norm = Normaliser(conn)
 
-    year_dirs = sorted(events_root.iterdir())
-    for year_dir in year_dirs:
+    event_dirs = []
+    for year_dir in sorted(events_root.iterdir()):
         if not year_dir.is_dir():
             continue
         if args.year and year_dir.name != str(args.year):
             continue
-
         for event_dir in sorted(year_dir.iterdir()):
             if not event_dir.is_dir():
                 continue
             if args.event and args.event.lower() not in event_dir.name.lower():
                 continue
+            event_dirs.append(event_dir)
+
+    # Compare every selected match folder with its fingerprints from the last
+    # ingest. With --jobs, worker processes then parse the changed files in the
+    # order the loop below ingests them; this process stays the only DB writer
+    changes = {}
+    for event_dir in event_dirs:
+        event_id = parse_event_folder(event_dir)["event_id"]
+        for stage_dir, match_dir in event_match_dirs(event_dir, args.match):
+            match_id = parse_match_folder(match_dir, event_id, stage_dir.name)["match_id"]
+            changes[match_dir] = file_changes(conn, match_id, match_dir, args.full)
+    unchanged = sum(1 for _, changed in changes.values() if not changed)
+    log.info(f"{len(changes) - unchanged} of {len(changes)} match folders changed since the last ingest")
+    parser = MatchParser(changes, args.jobs)
 
+    try:
+        for event_dir in event_dirs:
             if args.match:
                 # Only ingest a specific match
                 event_info = parse_event_folder(event_dir)
                 upsert_event(conn, norm, event_info)
                 event_id = event_info["event_id"]
-                for stage_dir in sorted(event_dir.iterdir()):
-                    if not stage_dir.is_dir():
-                        continue
-                    for match_dir in sorted(stage_dir.iterdir()):
-                        if not match_dir.is_dir():
-                            continue
-                        if args.match.lower() in match_dir.name.lower():
-                            ingest_match(conn, norm, match_dir, event_id, stage_dir.name.replace("_", " "))
+                for stage_dir, match_dir in event_match_dirs(event_dir, args.match):
+                    ingest_match(conn, norm, match_dir, event_id,
+                                 stage_dir.name.replace("_", " "), args.bulk, parser)
             else:
-                ingest_event(conn, norm, event_dir)
-
+                ingest_event(conn, norm, event_dir, args.bulk, parser)
+    finally:
+        parser.close()
+        if args.jobs > 1:
+            log.info(f"\nWriter waited {parser.waited:.2f}s for parsed matches ({args.jobs} parse processes)")
+
+    if args.bulk:
+        finish_bulk(conn)
+    elapsed = time.perf_counter() - started
+    rows    = conn.total_changes
     conn.close()
-    log.info("\nDone.")
+    log.info(f"\nDone in {elapsed:.2f}s: {rows:,} rows written ({rows / elapsed:,.0f} rows/s).")
 
 
 if __name__ == "__main__":
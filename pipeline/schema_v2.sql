@@ -265,9 +265,14 @@ CREATE TABLE IF NOT EXISTS raw_files (
   filename      TEXT NOT NULL,
   ingested_at   TEXT,
   row_count     INTEGER,
-  notes         TEXT
+  notes         TEXT,
+  size          INTEGER,             -- source file fingerprint, for incremental ingest
+  mtime         REAL,
+  content_hash  TEXT                 -- SHA-256 of the file
 );
 
+CREATE INDEX IF NOT EXISTS idx_raw_files_match ON raw_files(match_id);
+
 -- ============================================================
 -- 7) Convenience views
 -- ============================================================
@@ -52,6 +52,8 @@ def run_scraper(url: str, is_event: bool, skip: list[str], data_dir: Path):
         from main_scrape import process_match
         process_match(url, skip_types=skip, base_path=str(data_dir / "VCT Events"))
 
+    from utils import print_session_stats
+    print_session_stats()
     os.chdir(str(ROOT))
 
 
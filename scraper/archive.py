@@ -0,0 +1,467 @@
+"""
+Raw page archive for offline re-parsing.
+
+With --archive DIR, every page fetch_url returns with a 200 (downloaded or
+served from the response cache) is kept in DIR exactly as received, keyed by
+URL, and every match the scraper processes is listed in a manifest together
+with the stage folder it was written to. reparse.py can then rebuild the
+whole VCT Events/ tree from DIR with no network at all - after fixing a
+selector, say - instead of re-crawling at the polite request rate.
+
+VLR pages are mostly the same nav, scripts and table scaffolding, so bodies
+are compressed one at a time against a dictionary trained on the first pages
+archived: each page stays readable on its own (one seek, one decompress) but
+compresses almost as well as if its neighbours were in the same stream.
+zstandard is used when installed (pip install zstandard); otherwise zlib with
+a preset dictionary built from the lines the sample pages share.
+
+Layout:
+
+    CURRENT                  name of the generation directory in use
+    lock                     flock held while appending and while compacting
+    gen-<n>/pages.dat        compressed bodies, appended back to back
+    gen-<n>/index.jsonl      one line per stored page: url, match id, offset,
+                             length, size, codec, dictionary, encoding, time
+    gen-<n>/dicts/<id>.<codec>  compression dictionaries
+    gen-<n>/matches.jsonl    one line per processed match: url, stage folder
+
+compact writes a whole new generation and switches to it by replacing
+CURRENT, so readers and writers see either the old archive or the new one.
+
+Inspect an archive (compression ratio, random-read latency) or recompress it
+with a dictionary trained on everything in it:
+
+    python scraper/archive.py inspect DIR
+    python scraper/archive.py compact DIR
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import random
+import hashlib
+import shutil
+import argparse
+import tempfile
+import contextlib
+from collections import Counter
+from threading import Lock
+
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:  # POSIX only; on Windows only one process may write an archive
+    fcntl = None
+
+from frontier import match_id_from_url
+
+CODEC = "zstd" if zstandard is not None else "zlib"
+TRAIN_AFTER = 16                 # pages archived before the first dictionary is trained
+DICT_SIZES = {"zstd": 112 * 1024, "zlib": 32 * 1024}   # zlib's window caps a preset dictionary at 32 KB
+LEVELS = {"zstd": 12, "zlib": 9}
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = "lock"
+FIRST_GENERATION = "gen-0"
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+@contextlib.contextmanager
+def _archive_lock(archive_dir):
+    """Exclusive lock shared by every process writing to or compacting the archive."""
+    os.makedirs(archive_dir, exist_ok=True)
+    with open(os.path.join(archive_dir, LOCK_FILE), 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        yield  # closing the file releases the lock
+
+
+def _current_generation(archive_dir):
+    """The generation CURRENT points at; FIRST_GENERATION for a new archive."""
+    try:
+        with open(os.path.join(archive_dir, CURRENT_FILE), encoding='utf-8') as f:
+            return f.read().strip() or FIRST_GENERATION
+    except FileNotFoundError:
+        return FIRST_GENERATION
+
+
+def _dictionary_id(dictionary):
+    return hashlib.sha256(dictionary).hexdigest()[:16]
+
+
+def _read_jsonl(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            lines = f.readlines()
+    except OSError:
+        return []
+    entries = []
+    for line in lines:
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            continue  # a line cut short by a crash
+    return entries
+
+
+def _train_zlib_dict(samples, size):
+    """
+    Preset dictionary for zlib: lines that appear in most sample pages,
+    most common last (zlib finds matches near the end of the window first).
+    """
+    document_frequency = Counter()
+    for sample in samples:
+        document_frequency.update(set(line.strip() for line in sample.splitlines() if len(line.strip()) > 8))
+    threshold = max(2, len(samples) // 2)
+    common = [line for line, count in document_frequency.most_common() if count >= threshold]
+    chunks, total = [], 0
+    for line in common:
+        if total + len(line) + 1 > size:
+            break
+        chunks.append(line)
+        total += len(line) + 1
+    return b"\n".join(reversed(chunks))
+
+
+def train_dictionary(samples, codec=CODEC):
+    """Trains a compression dictionary from sample page bodies; None if there is too little to learn from."""
+    size = DICT_SIZES[codec]
+    if codec == "zstd":
+        try:
+            return zstandard.train_dictionary(size, samples).as_bytes()
+        except zstandard.ZstdError:
+            return None
+    return _train_zlib_dict(samples, size) or None
+
+
+class _Codec:
+    """Compresses / decompresses single pages with an optional dictionary."""
+
+    def __init__(self, codec, dictionary=None):
+        if codec == "zstd" and zstandard is None:
+            raise ImportError("This archive was written with zstandard (pip install zstandard)")
+        self.codec = codec
+        self.dictionary = dictionary
+        if codec == "zstd":
+            zdict = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+            self._compressor = zstandard.ZstdCompressor(level=LEVELS[codec], dict_data=zdict)
+            self._decompressor = zstandard.ZstdDecompressor(dict_data=zdict)
+        self._lock = Lock()  # zstd (de)compressor objects are not thread-safe
+
+    def compress(self, data):
+        if self.codec == "zstd":
+            with self._lock:
+                return self._compressor.compress(data)
+        compressor = zlib.compressobj(LEVELS["zlib"], zdict=self.dictionary) if self.dictionary \
+            else zlib.compressobj(LEVELS["zlib"])
+        return compressor.compress(data) + compressor.flush()
+
+    def decompress(self, data):
+        if self.codec == "zstd":
+            with self._lock:
+                return self._decompressor.decompress(data)
+        decompressor = zlib.decompressobj(zdict=self.dictionary) if self.dictionary else zlib.decompressobj()
+        return decompressor.decompress(data) + decompressor.flush()
+
+
+class PageArchive:
+    def __init__(self, archive_dir):
+        self.archive_dir = archive_dir
+        self._index = None      # url -> index entry, loaded on first use
+        self._codecs = {}       # (codec, dict id) -> _Codec
+        self._current_dict = None
+        self._dict_loaded = False
+        self._samples = []      # bodies kept to train the first dictionary
+        self._lock = Lock()
+        self._generation = _current_generation(archive_dir)
+
+    # ---- paths / dictionaries ----
+
+    def _path(self, name):
+        return os.path.join(self.archive_dir, self._generation, name)
+
+    def _dict_path(self, dict_id, codec):
+        return self._path(os.path.join('dicts', f"{dict_id}.{codec}"))
+
+    def _codec(self, codec, dict_id):
+        key = (codec, dict_id)
+        if key not in self._codecs:
+            dictionary = None
+            if dict_id:
+                with open(self._dict_path(dict_id, codec), 'rb') as f:
+                    dictionary = f.read()
+            self._codecs[key] = _Codec(codec, dictionary)
+        return self._codecs[key]
+
+    def _save_dictionary(self, dictionary, codec=CODEC):
+        dict_id = _dictionary_id(dictionary)
+        _write_atomic(self._dict_path(dict_id, codec), dictionary)
+        return dict_id
+
+    def use_dictionary(self, dictionary):
+        """Compresses pages stored from now on with `dictionary`."""
+        with self._lock:
+            self._current_dict = self._save_dictionary(dictionary)
+            self._dict_loaded = True
+
+    def _append(self, name, entry):
+        line = json.dumps(entry) + '\n'
+        os.makedirs(self._path(''), exist_ok=True)
+        with open(self._path(name), 'a', encoding='utf-8') as f:
+            f.write(line)
+
+    @contextlib.contextmanager
+    def _writing(self):
+        """
+        Holds the archive against this process's threads and, through the
+        lock file, other processes and compact. An archive compacted since
+        this one loaded it is followed into its new generation.
+        """
+        with self._lock, _archive_lock(self.archive_dir):
+            generation = _current_generation(self.archive_dir)
+            if not os.path.exists(os.path.join(self.archive_dir, CURRENT_FILE)):
+                _write_atomic(os.path.join(self.archive_dir, CURRENT_FILE), generation.encode('utf-8'))
+            if generation != self._generation:
+                self._generation = generation
+                self._index = None
+                self._dict_loaded = False
+            yield
+
+    def _dictionary_locked(self):
+        if not self._dict_loaded:
+            self._current_dict = self._latest_dictionary_locked(self._index_locked())
+            self._dict_loaded = True
+        return self._current_dict
+
+    # ---- writing (during a crawl) ----
+
+    def store(self, url, response):
+        """Keeps the body of a 200 response."""
+        self.store_body(url, response.content, response.encoding, response.headers.get('Content-Type'))
+
+    def store_body(self, url, body, encoding=None, content_type=None, archived_at=None):
+        with self._lock:
+            self._dictionary_locked()
+            if self._current_dict is None:
+                # Early pages go in without a dictionary until there are enough to train one
+                self._samples.append(body)
+                if len(self._samples) >= TRAIN_AFTER:
+                    dictionary = train_dictionary(self._samples)
+                    if dictionary:
+                        self._current_dict = self._save_dictionary(dictionary)
+                    self._samples = []
+
+            generation, dict_id = self._generation, self._current_dict
+            codec = self._codec(CODEC, dict_id)
+
+        # Compress outside the archive lock so fetch threads don't queue behind each other
+        compressed = codec.compress(body)
+
+        # Other processes append to the same pages.dat: the offset is only ours under the lock
+        with self._writing():
+            if self._generation != generation:
+                # Compacted meanwhile: the old generation's dictionaries are gone
+                dict_id = self._dictionary_locked()
+                compressed = self._codec(CODEC, dict_id).compress(body)
+            self._index_locked()
+            os.makedirs(self._path(''), exist_ok=True)
+            with open(self._path('pages.dat'), 'ab') as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(compressed)
+            entry = {
+                'url': url,
+                'match_id': match_id_from_url(url),
+                'offset': offset,
+                'length': len(compressed),
+                'size': len(body),
+                'codec': CODEC,
+                'dict': dict_id,
+                'encoding': encoding,
+                'content_type': content_type,
+                'archived_at': archived_at or time.time(),
+            }
+            self._append('index.jsonl', entry)
+            self._index[url] = entry
+
+    def record_match(self, match_url, stage_folder):
+        """Notes that `match_url` was written under `stage_folder` (relative to the crawl's working dir)."""
+        with self._writing():
+            self._append('matches.jsonl', {'url': match_url, 'stage_folder': stage_folder})
+
+    # ---- reading (offline) ----
+
+    def _index_locked(self):
+        if self._index is None:
+            self._index = {entry['url']: entry for entry in _read_jsonl(self._path('index.jsonl'))}
+        return self._index
+
+    def _latest_dictionary_locked(self, index):
+        for entry in reversed(list(index.values())):
+            if entry['codec'] == CODEC and entry['dict']:
+                return entry['dict']
+        return None
+
+    def index(self):
+        """url -> index entry for the latest copy of every archived page."""
+        with self._lock:
+            return self._index_locked()
+
+    def matches(self):
+        """(match_url, stage_folder) for every archived match; the latest record wins."""
+        latest = {}
+        for entry in _read_jsonl(self._path('matches.jsonl')):
+            latest.pop(entry['url'], None)
+            latest[entry['url']] = entry['stage_folder']
+        return list(latest.items())
+
+    def read(self, entry):
+        """Body of one archived page; only its own bytes are read and decompressed."""
+        with open(self._path('pages.dat'), 'rb') as f:
+            compressed = os.pread(f.fileno(), entry['length'], entry['offset'])
+        with self._lock:
+            codec = self._codec(entry['codec'], entry.get('dict'))
+        return codec.decompress(compressed)
+
+    def fetch(self, url):
+        """
+        Stand-in for utils.fetch_url that answers from the archive: a 200
+        Response for archived pages, None for anything else.
+        """
+        entry = self.index().get(url)
+        if entry is None:
+            return None
+        try:
+            body = self.read(entry)
+        except (OSError, zlib.error) as e:
+            print(f"Could not read {url} from the archive: {e}")
+            return None
+        response = Response()
+        response.status_code = 200
+        response.url = url
+        response._content = body
+        response.encoding = entry.get('encoding')
+        if entry.get('content_type'):
+            response.headers = CaseInsensitiveDict({'Content-Type': entry['content_type']})
+        return response
+
+    # ---- maintenance ----
+
+    def stats(self, reads=200):
+        """Size, compression ratio and random single-page read latency."""
+        entries = list(self.index().values())
+        raw = sum(e['size'] for e in entries)
+        stored = sum(e['length'] for e in entries)
+        dicts = {(e['codec'], e['dict']) for e in entries if e.get('dict')}
+        dict_bytes = sum(os.path.getsize(self._dict_path(dict_id, codec)) for codec, dict_id in dicts)
+        data_bytes = os.path.getsize(self._path('pages.dat')) if os.path.exists(self._path('pages.dat')) else 0
+
+        latencies = []
+        sample = random.sample(entries, min(reads, len(entries))) if entries else []
+        self._codecs.clear()
+        for entry in sample:
+            start = time.perf_counter()
+            self.read(entry)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+
+        return {
+            'pages': len(entries),
+            'matches': len(self.matches()),
+            'codecs': dict(Counter(e['codec'] for e in entries)),
+            'raw_bytes': raw,
+            'stored_bytes': stored,
+            'data_file_bytes': data_bytes,
+            'dict_bytes': dict_bytes,
+            'ratio': raw / (stored + dict_bytes) if stored else 0.0,
+            'read_ms_p50': latencies[len(latencies) // 2] if latencies else 0.0,
+            'read_ms_p95': latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+            'read_ms_max': latencies[-1] if latencies else 0.0,
+        }
+
+
+def compact(archive_dir):
+    """
+    Rewrites an archive keeping only the latest copy of each page, compressed
+    with a dictionary trained on all of them. The result is a new generation
+    that replaces the old one in a single rename; writers wait until then.
+    """
+    with _archive_lock(archive_dir):
+        source = PageArchive(archive_dir)
+        entries = list(source.index().values())
+        samples = [source.read(e) for e in random.sample(entries, min(len(entries), 1000))]
+        dictionary = train_dictionary(samples)
+
+        generation = f"gen-{int(source._generation.rsplit('-', 1)[1]) + 1}"
+        generation_dir = os.path.join(archive_dir, generation)
+        shutil.rmtree(generation_dir, ignore_errors=True)  # left by a compaction that crashed
+        os.makedirs(generation_dir)
+        dict_id = None
+        if dictionary:
+            dict_id = _dictionary_id(dictionary)
+            _write_atomic(os.path.join(generation_dir, 'dicts', f"{dict_id}.{CODEC}"), dictionary)
+        codec = _Codec(CODEC, dictionary)
+
+        index = []
+        with open(os.path.join(generation_dir, 'pages.dat'), 'wb') as f:
+            for entry in entries:
+                body = source.read(entry)
+                compressed = codec.compress(body)
+                index.append({**entry, 'offset': f.tell(), 'length': len(compressed), 'size': len(body),
+                              'codec': CODEC, 'dict': dict_id})
+                f.write(compressed)
+        with open(os.path.join(generation_dir, 'index.jsonl'), 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(entry) + '\n' for entry in index)
+        with open(os.path.join(generation_dir, 'matches.jsonl'), 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps({'url': url, 'stage_folder': stage_folder}) + '\n'
+                         for url, stage_folder in source.matches())
+
+        _write_atomic(os.path.join(archive_dir, CURRENT_FILE), generation.encode('utf-8'))
+    shutil.rmtree(os.path.join(archive_dir, source._generation), ignore_errors=True)
+    return len(entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect or compact a page archive written with --archive.')
+    parser.add_argument('command', choices=['inspect', 'compact'])
+    parser.add_argument('archive', help='Archive directory')
+    parser.add_argument('--reads', type=int, default=200, help='Random page reads timed by inspect (default: 200)')
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(args.archive, CURRENT_FILE)):
+        print(f"No archive index in {args.archive}")
+        sys.exit(1)
+
+    if args.command == 'compact':
+        before = PageArchive(args.archive).stats(reads=0)
+        pages = compact(args.archive)
+        after = PageArchive(args.archive).stats(reads=0)
+        print(f"Compacted {pages} pages: {before['stored_bytes'] / 1e6:.2f} MB -> {after['stored_bytes'] / 1e6:.2f} MB "
+              f"({before['ratio']:.1f}x -> {after['ratio']:.1f}x)")
+        return
+
+    stats = PageArchive(args.archive).stats(reads=args.reads)
+    print(f"Pages:        {stats['pages']} ({stats['matches']} matches) {stats['codecs']}")
+    print(f"Raw:          {stats['raw_bytes'] / 1e6:.2f} MB")
+    print(f"Stored:       {stats['stored_bytes'] / 1e6:.2f} MB + {stats['dict_bytes'] / 1e3:.0f} KB dictionaries "
+          f"(pages.dat {stats['data_file_bytes'] / 1e6:.2f} MB)")
+    print(f"Ratio:        {stats['ratio']:.1f}x")
+    print(f"Random read:  p50 {stats['read_ms_p50']:.2f} ms, p95 {stats['read_ms_p95']:.2f} ms, "
+          f"max {stats['read_ms_max']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
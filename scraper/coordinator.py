@@ -0,0 +1,148 @@
+"""
+Serves a crawl frontier to workers on other hosts over HTTP.
+
+For a distributed crawl the frontier is the shared work queue. Workers that
+can all mount one volume can open the SQLite file directly
+(--shared-frontier); otherwise run this next to it:
+
+    python scraper/scrape_global.py --discover-only --frontier crawl_frontier.db
+    python scraper/coordinator.py --frontier crawl_frontier.db --host 0.0.0.0 --port 8765 --token SECRET
+
+and point each worker at it:
+
+    python scraper/scrape_global.py --worker --coordinator http://HOST:8765 --coordinator-token SECRET
+
+It listens on 127.0.0.1 unless given --host. With --token every request
+must carry the same token in the X-Coordinator-Token header; without one
+anybody who can reach the port can lease and mark matches.
+
+The protocol is one POST per frontier method, with its arguments as a JSON
+object {"args": [...], "kwargs": {...}} and its result as JSON; GET /status
+returns the match counts.
+"""
+import hmac
+import json
+import argparse
+import functools
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from frontier import Frontier, DEFAULT_FRONTIER_PATH
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+TOKEN_HEADER = "X-Coordinator-Token"
+
+# Frontier methods a worker may call
+METHODS = ("lease", "renew", "mark_fetched", "mark_extracted", "mark_failed", "counts", "leased")
+
+
+class RemoteFrontier:
+    """The worker side: the Frontier methods in METHODS, called on a coordinator."""
+
+    def __init__(self, url, timeout=30, token=None):
+        self.path = url.rstrip('/')
+        self.timeout = timeout
+        self._session = requests.Session()
+        if token:
+            self._session.headers[TOKEN_HEADER] = token
+
+    def _call(self, method, *args, **kwargs):
+        response = self._session.post(f"{self.path}/{method}", json={"args": list(args), "kwargs": kwargs},
+                                      timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def __getattr__(self, name):
+        if name not in METHODS:
+            raise AttributeError(name)
+        return functools.partial(self._call, name)
+
+    def close(self):
+        self._session.close()
+
+
+class CoordinatorHandler(BaseHTTPRequestHandler):
+    frontier = None
+    token = None
+
+    def _reply(self, status, result):
+        body = json.dumps(result).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self):
+        if not self.token:
+            return True
+        if hmac.compare_digest(self.headers.get(TOKEN_HEADER, ''), self.token):
+            return True
+        self._reply(401, {"error": "bad or missing token"})
+        return False
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        if self.path.rstrip('/') != '/status':
+            return self._reply(404, {"error": "not found"})
+        self._reply(200, {"matches": self.frontier.counts(), "leased": self.frontier.leased()})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        method = self.path.strip('/')
+        if method not in METHODS:
+            return self._reply(404, {"error": f"unknown method {method}"})
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            # A bare list is the positional arguments alone
+            if isinstance(payload, list):
+                payload = {"args": payload}
+            result = getattr(self.frontier, method)(*payload.get("args", []), **payload.get("kwargs", {}))
+        except Exception as e:
+            return self._reply(500, {"error": str(e)})
+        self._reply(200, result)
+
+    def log_message(self, format, *args):
+        pass  # one line per call would drown the crawl's own output
+
+
+def make_server(frontier, host, port, token=None):
+    """An HTTP server answering worker calls on `frontier`; not started yet."""
+    handler = type("Handler", (CoordinatorHandler,), {"frontier": frontier, "token": token})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def serve(frontier_path=DEFAULT_FRONTIER_PATH, host=DEFAULT_HOST, port=DEFAULT_PORT, token=None):
+    frontier = Frontier(frontier_path)
+    server = make_server(frontier, host, port, token)
+    print(f"Serving {frontier_path} to crawl workers on http://{host}:{port}")
+    if not token and host not in ("127.0.0.1", "localhost", "::1"):
+        print("Warning: no --token given, any host that can reach this port can change the frontier")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        frontier.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a crawl frontier to distributed scrape_global workers.')
+    parser.add_argument('--frontier', default=DEFAULT_FRONTIER_PATH,
+                        help=f'SQLite frontier file (default: {DEFAULT_FRONTIER_PATH})')
+    parser.add_argument('--host', default=DEFAULT_HOST,
+                        help=f'Address to listen on (default: {DEFAULT_HOST}; 0.0.0.0 for all interfaces)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Port to listen on (default: {DEFAULT_PORT})')
+    parser.add_argument('--token', help=f'Shared secret workers must send in the {TOKEN_HEADER} header')
+    args = parser.parse_args()
+    serve(args.frontier, args.host, args.port, args.token)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Persistent crawl frontier for scrape_global.
+
+Every match URL the crawl discovers gets a row in a small SQLite file, keyed
+by the VLR match id in its path (/<match id>/<slug>). The row records how far
+the match got:
+
+    discovered   found on a stage page, not fetched yet
+    fetched      match page downloaded and its output folder created
+    extracted    every extractor finished - nothing left to do
+    failed       the page could not be fetched or an extractor raised
+
+plus the number of attempts, the last error and timestamps, and the match
+status read from its page (completed, live or upcoming). A completed match
+that has been extracted can never change, so it is skipped without a
+request; live and upcoming matches are fetched again on every run.
+
+Events are tracked the same way, with the status shown on the events
+listing. Once a completed event has every one of its matches extracted,
+and the crawl that checks it loaded every one of its stage pages, it is
+marked done, and later runs skip it without fetching the event page or
+its stages - a refresh only re-polls the listing pages and the live and
+upcoming events.
+
+--resume re-queues everything an interrupted crawl left unfinished. Each
+update is committed immediately, so a crash loses at most the match that
+was being worked on.
+
+The same table is the work queue of a distributed crawl: `lease` hands a
+worker a batch of unfinished matches for LEASE_SECONDS, which the worker
+renews while it is alive, and a lease whose worker died simply expires and
+the match is handed out again. Workers
+reach it either by opening the file on a shared volume or through
+coordinator.py.
+"""
+import re
+import time
+import sqlite3
+from threading import Lock
+from urllib.parse import urlparse
+
+DEFAULT_FRONTIER_PATH = "crawl_frontier.db"
+
+# Matches that failed this many times in a row are left alone by --resume and lease
+MAX_ATTEMPTS = 3
+
+# How long a distributed worker may hold a match before it is handed to another
+LEASE_SECONDS = 600
+
+# Wait this long for another process's write lock before failing
+BUSY_TIMEOUT_MS = 30000
+
+DISCOVERED, FETCHED, EXTRACTED, FAILED = "discovered", "fetched", "extracted", "failed"
+
+# Event / match status as shown on vlr.gg
+COMPLETED, LIVE, UPCOMING = "completed", "live", "upcoming"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    match_id      TEXT PRIMARY KEY,
+    url           TEXT NOT NULL,
+    stage_folder  TEXT,
+    output_folder TEXT,
+    event_id      TEXT,
+    status        TEXT,
+    state         TEXT NOT NULL DEFAULT 'discovered',
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    last_error    TEXT,
+    lease_owner   TEXT,
+    lease_expires REAL,
+    discovered_at REAL NOT NULL,
+    updated_at    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_matches_state ON matches(state);
+
+CREATE TABLE IF NOT EXISTS events (
+    event_id      TEXT PRIMARY KEY,
+    url           TEXT NOT NULL,
+    status        TEXT,
+    done          INTEGER NOT NULL DEFAULT 0,
+    updated_at    REAL NOT NULL
+);
+"""
+
+def match_id_from_url(url):
+    """VLR match id from a match URL, or the URL itself if it has none."""
+    m = re.match(r'^/(\d+)(/|$)', urlparse(url).path)
+    return m.group(1) if m else url
+
+
+def event_id_from_url(url):
+    """VLR event id from /event/<id>/... or /event/matches/<id>/... URLs."""
+    m = re.match(r'^/event/(?:matches/)?(\d+)(/|$)', urlparse(url).path)
+    return m.group(1) if m else url
+
+
+class Frontier:
+    def __init__(self, path=DEFAULT_FRONTIER_PATH, shared=False):
+        """`shared`: the file is on a network volume used from several hosts."""
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        # WAL needs shared memory, i.e. every process on one host
+        self._conn.execute("PRAGMA journal_mode = DELETE" if shared else "PRAGMA journal_mode = WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = Lock()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # ---- lookups ----
+
+    def get(self, url):
+        """The frontier row for a match URL as a dict, or None if never seen."""
+        with self._lock:
+            cursor = self._conn.execute("SELECT * FROM matches WHERE match_id = ?", (match_id_from_url(url),))
+            row = cursor.fetchone()
+            return dict(zip([c[0] for c in cursor.description], row)) if row else None
+
+    def is_immutable(self, url):
+        """True for a completed match that has been extracted: it can be skipped for good."""
+        row = self.get(url)
+        return row is not None and row['state'] == EXTRACTED and row['status'] == COMPLETED
+
+    def is_event_done(self, url):
+        """True for a completed event whose matches are all immutable."""
+        rows = self._execute("SELECT done, status FROM events WHERE event_id = ?", (event_id_from_url(url),))
+        return bool(rows) and rows[0][0] == 1 and rows[0][1] == COMPLETED
+
+    def pending(self, max_attempts=MAX_ATTEMPTS):
+        """(url, stage_folder) of matches an earlier run left unfinished."""
+        return self._execute(
+            "SELECT url, stage_folder FROM matches WHERE state != ? AND attempts < ? ORDER BY discovered_at",
+            (EXTRACTED, max_attempts))
+
+    def counts(self):
+        """Number of matches in each state."""
+        return dict(self._execute("SELECT state, COUNT(*) FROM matches GROUP BY state"))
+
+    def leased(self):
+        """Number of unfinished matches currently leased to a worker."""
+        return self._execute("SELECT COUNT(*) FROM matches WHERE state != ? AND lease_expires >= ?",
+                             (EXTRACTED, time.time()))[0][0]
+
+    def event_counts(self):
+        """Number of events tracked and how many of them are done."""
+        rows = self._execute("SELECT COUNT(*), COALESCE(SUM(done), 0) FROM events")
+        return {"events": rows[0][0], "done": rows[0][1]}
+
+    # ---- updates ----
+
+    def record_event(self, url, status):
+        """Records an event seen on a listing page with its current status."""
+        self._execute(
+            "INSERT INTO events (event_id, url, status, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(event_id) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at",
+            (event_id_from_url(url), url, status, time.time()))
+
+    def finish_event(self, url):
+        """
+        Marks a completed event done if every match found for it is immutable.
+        Returns whether it was marked.
+        """
+        event_id = event_id_from_url(url)
+        rows = self._execute(
+            "SELECT COUNT(*), COALESCE(SUM(state = ? AND status = ?), 0) FROM matches WHERE event_id = ?",
+            (EXTRACTED, COMPLETED, event_id))
+        total, immutable = rows[0]
+        if total == 0 or immutable < total:
+            return False
+        self._execute("UPDATE events SET done = 1, updated_at = ? WHERE event_id = ? AND status = ?",
+                      (time.time(), event_id, COMPLETED))
+        return self.is_event_done(url)
+
+    def lease(self, owner, limit=1, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS):
+        """
+        Hands up to `limit` unfinished matches that nobody holds (or whose
+        lease has expired) to `owner` for `lease_seconds`. Returns their
+        (url, stage_folder); the lease ends when the match is marked
+        extracted or failed.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT match_id, url, stage_folder FROM matches WHERE state != ? AND attempts < ? "
+                    "AND (lease_expires IS NULL OR lease_expires < ?) ORDER BY discovered_at LIMIT ?",
+                    (EXTRACTED, max_attempts, now, limit)).fetchall()
+                self._conn.executemany(
+                    "UPDATE matches SET lease_owner = ?, lease_expires = ?, updated_at = ? WHERE match_id = ?",
+                    [(owner, now + lease_seconds, now, match_id) for match_id, _, _ in rows])
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [(url, stage_folder) for _, url, stage_folder in rows]
+
+    def renew(self, owner, lease_seconds=LEASE_SECONDS):
+        """Extends every lease `owner` still holds by `lease_seconds` from now; a worker's heartbeat."""
+        now = time.time()
+        self._execute("UPDATE matches SET lease_expires = ?, updated_at = ? WHERE lease_owner = ? AND state != ?",
+                      (now + lease_seconds, now, owner, EXTRACTED))
+
+    def reopen(self, url):
+        """Puts an extracted match that can still change (live, upcoming) back in the work queue."""
+        self._execute("UPDATE matches SET state = ?, attempts = 0, updated_at = ? WHERE match_id = ? AND state = ?",
+                      (DISCOVERED, time.time(), match_id_from_url(url), EXTRACTED))
+
+    def discover(self, url, stage_folder, event_url=None):
+        """
+        Records a match found on a stage page; a known match keeps its state.
+        `stage_folder` is relative to the VCT Events root, so each worker
+        resolves it against its own output tree.
+        """
+        now = time.time()
+        event_id = event_id_from_url(event_url) if event_url else None
+        self._execute(
+            "INSERT OR IGNORE INTO matches (match_id, url, stage_folder, event_id, state, discovered_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (match_id_from_url(url), url, stage_folder, event_id, DISCOVERED, now, now))
+        if event_id:
+            self._execute("UPDATE matches SET event_id = ? WHERE match_id = ? AND event_id IS NULL",
+                          (event_id, match_id_from_url(url)))
+
+    def mark_fetched(self, url, output_folder, status=None):
+        """The match page was downloaded."""
+        self._execute(
+            "UPDATE matches SET state = ?, output_folder = ?, status = COALESCE(?, status), "
+            "last_error = NULL, updated_at = ? WHERE match_id = ?",
+            (FETCHED, output_folder, status, time.time(), match_id_from_url(url)))
+
+    def mark_extracted(self, url, output_folder=None, status=None):
+        self._execute(
+            "UPDATE matches SET state = ?, output_folder = COALESCE(?, output_folder), "
+            "status = COALESCE(?, status), attempts = 0, last_error = NULL, lease_owner = NULL, "
+            "lease_expires = NULL, updated_at = ? WHERE match_id = ?",
+            (EXTRACTED, output_folder, status, time.time(), match_id_from_url(url)))
+
+    def mark_failed(self, url, error, attempt=False):
+        """
+        Records a failure; with `attempt` it counts towards MAX_ATTEMPTS,
+        after which --resume and lease leave the match alone.
+        """
+        self._execute(
+            "UPDATE matches SET state = ?, last_error = ?, attempts = attempts + ?, "
+            "lease_owner = NULL, lease_expires = NULL, updated_at = ? WHERE match_id = ?",
+            (FAILED, str(error), int(attempt), time.time(), match_id_from_url(url)))
+
+
+def add_frontier_args(parser):
+    """Adds the frontier options to a crawl CLI."""
+    parser.add_argument('--frontier', default=DEFAULT_FRONTIER_PATH,
+                        help=f'SQLite file tracking crawled matches (default: {DEFAULT_FRONTIER_PATH})')
+    parser.add_argument('--resume', action='store_true',
+                        help='Re-queue matches an interrupted crawl left unfinished before discovering new ones')
+    parser.add_argument('--shared-frontier', action='store_true',
+                        help='The frontier file is on a network volume used by workers on several hosts')
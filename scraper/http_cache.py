@@ -0,0 +1,172 @@
+"""
+On-disk HTTP response cache used by utils.fetch_url.
+
+Bodies are stored content-addressed under objects/ (file name = sha256 of
+the body), so identical pages share one file. Each URL gets a small JSON
+entry under urls/ with its validators, fetch time and page type. A cached
+page is served straight from disk while it is within its page type's TTL;
+after that it is revalidated with If-None-Match / If-Modified-Since when
+the server gave us an ETag or Last-Modified, and refetched otherwise.
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import tempfile
+from threading import Lock
+from urllib.parse import urlparse
+
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+# Seconds a cached page is served without asking the server.
+# None means the page can no longer change and is never refetched.
+TTLS = {
+    "listing": 60 * 60,          # /events/?tier=60... listing pages
+    "event": 6 * 60 * 60,        # event overview and stage match lists
+    "match_live": 5 * 60,        # match that is upcoming or in progress
+    "match_final": None,         # finished match - immutable
+    "other": 60 * 60,
+}
+
+# Headers kept with a cached body
+KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+_FINAL_NOTE = re.compile(rb'class="match-header-vs-note"[^>]*>\s*final\s*<', re.IGNORECASE)
+
+
+def page_type(url, body=None):
+    """Classifies a VLR URL (and, for match pages, its body) into a TTLS key."""
+    path = urlparse(url).path
+    if path.startswith('/events'):
+        return "listing"
+    if path.startswith('/event/'):
+        return "event"
+    if re.match(r'^/\d+(/|$)', path):
+        if body is not None and _FINAL_NOTE.search(body):
+            return "match_final"
+        return "match_live"
+    return "other"
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class HttpCache:
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.hits = 0           # served from disk without a request
+        self.revalidated = 0    # 304 Not Modified
+        self.misses = 0         # full download
+        self.bytes_saved = 0    # body bytes not downloaded thanks to the cache
+        self._lock = Lock()
+
+    # ---- paths ----
+
+    def _entry_path(self, url):
+        key = _sha256(url.encode('utf-8'))
+        return os.path.join(self.cache_dir, 'urls', key[:2], key + '.json')
+
+    def _object_path(self, digest):
+        return os.path.join(self.cache_dir, 'objects', digest[:2], digest)
+
+    # ---- lookups ----
+
+    def lookup(self, url):
+        """Returns the cached entry for `url` (body included) or None."""
+        try:
+            with open(self._entry_path(url), encoding='utf-8') as f:
+                entry = json.load(f)
+            with open(self._object_path(entry['body_sha256']), 'rb') as f:
+                entry['body'] = f.read()
+        except (OSError, ValueError, KeyError):
+            return None
+        return entry
+
+    def is_fresh(self, entry, now=None):
+        ttl = TTLS.get(entry.get('page_type'), TTLS["other"])
+        if ttl is None:
+            return True
+        now = time.time() if now is None else now
+        return now - entry['fetched_at'] < ttl
+
+    def validators(self, entry):
+        """Conditional request headers for a stale entry."""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    # ---- updates ----
+
+    def store(self, url, response):
+        """Saves a 200 response."""
+        body = response.content
+        digest = _sha256(body)
+        object_path = self._object_path(digest)
+        if not os.path.exists(object_path):
+            _write_atomic(object_path, body)
+
+        headers = {h: response.headers[h] for h in KEPT_HEADERS if h in response.headers}
+        entry = {
+            'url': url,
+            'fetched_at': time.time(),
+            'page_type': page_type(url, body),
+            'encoding': response.encoding,
+            'headers': headers,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'body_sha256': digest,
+            'size': len(body),
+        }
+        _write_atomic(self._entry_path(url), json.dumps(entry).encode('utf-8'))
+        with self._lock:
+            self.misses += 1
+
+    def record_hit(self, entry):
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += entry['size']
+
+    def record_not_modified(self, url, entry):
+        """The server answered 304: the cached body is good for another TTL."""
+        entry = dict(entry)
+        body = entry.pop('body')
+        entry['fetched_at'] = time.time()
+        entry['page_type'] = page_type(url, body)
+        _write_atomic(self._entry_path(url), json.dumps(entry).encode('utf-8'))
+        with self._lock:
+            self.revalidated += 1
+            self.bytes_saved += entry['size']
+
+    # ---- helpers ----
+
+    def to_response(self, url, entry):
+        """Builds a requests.Response from a cached entry."""
+        response = Response()
+        response.status_code = 200
+        response.url = url
+        response._content = entry['body']
+        response.encoding = entry.get('encoding')
+        response.headers = CaseInsensitiveDict(entry.get('headers', {}))
+        return response
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'revalidated': self.revalidated,
+            'misses': self.misses,
+            'bytes_saved': self.bytes_saved,
+        }
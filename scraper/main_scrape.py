@@ -1,26 +1,22 @@
 import os
 import re
-import csv
+import asyncio
 import argparse
 import requests
-import pandas as pd
-from bs4 import BeautifulSoup
+import soupsieve as sv
+import utils
 from urllib.parse import urlparse, parse_qs
-from utils import fetch_url
+from pages import PageMemo
+import sinks
+from parsing import parse_html, add_parser_args, apply_parser_args
+from utils import fetch_url, run_blocking, add_http_args, apply_http_args, print_session_stats
 
 
-def create_folder_structure(match_url, base_path=None):
-    """Creates a clean folder structure based on match details from URL."""
-    # First, get the match title
-    # headers are now handled by fetch_url
-    
-    response = fetch_url(match_url)
-    if not response or response.status_code != 200:
-        print("Failed to fetch the webpage.")
-        return None
+MATCH_SUBFOLDERS = ['map_veto', 'player_stats', 'rounds', 'economy', 'performance']
 
-    soup = BeautifulSoup(response.text, 'html.parser')
 
+def match_folder(match_url, soup, base_path=None):
+    """Output folder for a match, named from its page header (teams and event)."""
     # Try to extract match title
     match_header = soup.select_one('.match-header-vs')
     folder_name = ""
@@ -47,23 +43,42 @@ def create_folder_structure(match_url, base_path=None):
 
     # Construct full path
     if base_path:
-        full_path = os.path.join(base_path, folder_name)
-    else:
-        full_path = folder_name
+        return os.path.join(base_path, folder_name)
+    return folder_name
 
-    # Create main folder and subfolders
-    if not os.path.exists(full_path):
-        os.makedirs(full_path)
 
-    subfolders = ['map_veto', 'player_stats', 'rounds', 'economy', 'performance']
-    for subfolder in subfolders:
-        subfolder_path = os.path.join(full_path, subfolder)
-        if not os.path.exists(subfolder_path):
-            os.makedirs(subfolder_path)
+def create_folder_structure(match_url, base_path=None, memo=None, sink=None):
+    """Creates a clean folder structure based on match details from URL."""
+    # First, get the match title
+    memo = memo or PageMemo()
+
+    soup = memo.get_soup(match_url)
+    if soup is None:
+        print("Failed to fetch the webpage.")
+        return None
+
+    full_path = match_folder(match_url, soup, base_path)
+
+    # Create main folder and subfolders (exist_ok: concurrent matches may share a folder name)
+    (sink or sinks.OUTPUT_SINK).make_folders(full_path, MATCH_SUBFOLDERS)
 
     return full_path
 
 
+def match_status(soup):
+    """
+    'completed', 'live' or 'upcoming', from the note under the match score
+    ("final", "live", or the time left before an upcoming match).
+    """
+    note = soup.select_one('.match-header-vs-note') if soup is not None else None
+    text = note.text.strip().lower() if note else ""
+    if text == "final":
+        return "completed"
+    if text == "live":
+        return "live"
+    return "upcoming"
+
+
 def clean_filename(name):
     """Clean a string to make it a valid filename."""
     # First, remove any non-printable characters and strip whitespace
@@ -83,16 +98,16 @@ def clean_filename(name):
     return name
 
 
-def fetch_map_veto(url, output_folder):
+def fetch_map_veto(url, output_folder, memo=None, sink=None):
     """Scrapes map veto information and saves to CSV."""
-    # Headers handled by fetch_url
+    memo = memo or PageMemo()
+    sink = sink or sinks.OUTPUT_SINK
 
-    response = fetch_url(url)
-    if not response or response.status_code != 200:
+    soup = memo.get_soup(url)
+    if soup is None:
         print("Failed to fetch the webpage.")
         return
 
-    soup = BeautifulSoup(response.text, 'html.parser')
     veto_text = soup.select_one('.match-header-note')
 
     if not veto_text:
@@ -129,26 +144,38 @@ def fetch_map_veto(url, output_folder):
         map_data[decider_map[0]] = {"pick": "decider", "ban": ""}
 
     output_file = os.path.join(output_folder, 'map_veto', 'map_veto.csv')
-    with open(output_file, 'w', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file)
-        writer.writerow(["map", "pick", "ban"])
-        for map_name, details in map_data.items():
-            writer.writerow([map_name, details["pick"], details["ban"]])
+    sink.write_rows(output_file, ["map", "pick", "ban"],
+                    [[map_name, details["pick"], details["ban"]] for map_name, details in map_data.items()])
 
     print(f"Map veto data saved to {output_file}")
 
 
-def fetch_player_stats(match_url, output_folder):
+# Player stats selectors, compiled once per process
+STATS_CONTAINER = sv.compile('.vm-stats-game[data-game-id]')
+STATS_ROW = sv.compile('tbody tr')
+PLAYER_NAME = sv.compile('.text-of')
+PLAYER_TEAM = sv.compile('.ge-text-light')
+AGENT_IMG = sv.compile('.mod-agent img')
+STAT_CELL = sv.compile('.mod-stat .side')
+
+# Side label -> class on the stat spans (mod-both = both halves)
+SIDE_CLASSES = {
+    "All": "mod-both",
+    "Attack": "mod-t",
+    "Defend": "mod-ct",
+}
+
+
+def fetch_player_stats(match_url, output_folder, memo=None, sink=None):
     """Scrapes player statistics and saves to CSV."""
-    # Headers handled by fetch_url
+    memo = memo or PageMemo()
+    sink = sink or sinks.OUTPUT_SINK
 
-    response = fetch_url(match_url)
-    if not response or response.status_code != 200:
+    soup = memo.get_soup(match_url)
+    if soup is None:
         print("Failed to fetch the webpage.")
         return
 
-    soup = BeautifulSoup(response.text, 'html.parser')
-
     # Extract maps played and their respective numbers
     maps = {}
     for idx, map_item in enumerate(soup.select('.vm-stats-gamesnav-item.js-map-switch')):
@@ -162,54 +189,56 @@ def fetch_player_stats(match_url, output_folder):
             map_label = f"Map_{idx}_{map_name}" if idx else "All_Maps"
             maps[game_id] = map_label
 
-    # Define side classes and labels
-    side_classes = {
-        "All": ".mod-stat .side.mod-both",
-        "Attack": ".mod-stat .side.mod-t",
-        "Defend": ".mod-stat .side.mod-ct"
-    }
+    containers = {}
+    for container in STATS_CONTAINER.select(soup):
+        containers.setdefault(container.get("data-game-id"), []).append(container)
 
     for map_id, map_name in maps.items():
         output_file = os.path.join(output_folder, 'player_stats', f"{map_name}.csv")
 
-        rows = []
-        for side_label, side_class in side_classes.items():
-            for row in soup.select(f'.vm-stats-game[data-game-id="{map_id}"] tbody tr'):
-                player_name = row.select_one('.text-of').text.strip() if row.select_one('.text-of') else "Unknown"
-                team_name = row.select_one('.ge-text-light').text.strip() if row.select_one(
-                    '.ge-text-light') else "Unknown"
-                agents = ', '.join(img['title'] for img in row.select('.mod-agent img') if 'title' in img.attrs)
-                stats = [span.text.strip() for span in row.select(side_class)]
-
-                if not stats:
-                    continue
-
-                row_data = [player_name, team_name, map_name, side_label, agents] + stats
-                rows.append(row_data)
+        # One pass over the rows fills every side; rows stay grouped All, Attack, Defend
+        side_rows = {side_label: [] for side_label in SIDE_CLASSES}
+        for container in containers.get(map_id, []):
+            for row in STATS_ROW.select(container):
+                name_tag = PLAYER_NAME.select_one(row)
+                team_tag = PLAYER_TEAM.select_one(row)
+                player_name = name_tag.text.strip() if name_tag else "Unknown"
+                team_name = team_tag.text.strip() if team_tag else "Unknown"
+                agents = ', '.join(img['title'] for img in AGENT_IMG.select(row) if 'title' in img.attrs)
+
+                stats = {side_label: [] for side_label in SIDE_CLASSES}
+                for span in STAT_CELL.select(row):
+                    span_classes = span.get('class', [])
+                    for side_label, side_class in SIDE_CLASSES.items():
+                        if side_class in span_classes:
+                            stats[side_label].append(span.text.strip())
+
+                for side_label, side_stats in stats.items():
+                    if side_stats:
+                        side_rows[side_label].append([player_name, team_name, map_name, side_label, agents] + side_stats)
+
+        rows = [row for side_label in SIDE_CLASSES for row in side_rows[side_label]]
 
         # Save data to CSV
         if rows:
-            with open(output_file, 'w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow(
-                    ['Player', 'Team', 'Map', 'Side', 'Agents', 'R2.0', 'ACS', 'K', 'D', 'A', 'K/D', 'KAST', 'ADR',
-                     'HS%', 'FK', 'FD', 'FK/FD'])
-                writer.writerows(rows)
+            sink.write_rows(output_file,
+                            ['Player', 'Team', 'Map', 'Side', 'Agents', 'R2.0', 'ACS', 'K', 'D', 'A', 'K/D', 'KAST',
+                             'ADR', 'HS%', 'FK', 'FD', 'FK/FD'],
+                            rows)
 
             print(f"Player stats saved to {output_file}")
 
 
-def fetch_round_data(match_url, output_folder):
+def fetch_round_data(match_url, output_folder, memo=None, sink=None):
     """Scrapes round-by-round data and saves to CSV."""
-    # Headers handled by fetch_url
+    memo = memo or PageMemo()
+    sink = sink or sinks.OUTPUT_SINK
 
-    response = fetch_url(match_url)
-    if not response or response.status_code != 200:
+    soup = memo.get_soup(match_url)
+    if soup is None:
         print("Failed to fetch the webpage.")
         return
 
-    soup = BeautifulSoup(response.text, 'html.parser')
-
     maps = {}
     for map_item in soup.select('.vm-stats-gamesnav-item.js-map-switch'):
         map_name = clean_filename(map_item.text.strip())
@@ -253,24 +282,25 @@ def fetch_round_data(match_url, output_folder):
                 rounds_data.append([map_name, round_num, f'"{round_result}"', winner, winner_side, method])
 
         if rounds_data:
-            with open(output_file, 'w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow(["Map", "Round Number", "Score", "Winning Team", "Winning Side", "Win Method"])
-                writer.writerows(rounds_data)
+            sink.write_rows(output_file,
+                            ["Map", "Round Number", "Score", "Winning Team", "Winning Side", "Win Method"],
+                            rounds_data)
 
             print(f"Round data saved to {output_file}")
 
 
-def fetch_economy_data(match_url, output_folder):
+def fetch_economy_data(match_url, output_folder, memo=None, sink=None):
     """Scrapes economy data and saves to CSV with proper formatting."""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36'
-    }
+    memo = memo or PageMemo()
+    sink = sink or sinks.OUTPUT_SINK
 
     if not match_url.endswith('/'):
         match_url += '/'
 
-    soup = fetch_soup(match_url + "?game=all&tab=economy", headers)
+    soup = memo.get_soup(match_url + "?game=all&tab=economy")
+    if soup is None:
+        print("Failed to fetch the economy page.")
+        return
 
     map_tabs = soup.find_all("div", class_="vm-stats-gamesnav-item js-map-switch")
     map_ids = {clean_filename(tab.get_text(strip=True)): tab.get("data-game-id", "all") for tab in map_tabs}
@@ -279,13 +309,25 @@ def fetch_economy_data(match_url, output_folder):
         map_ids["All_Maps"] = "all"
 
     econ_table_class = "wf-table-inset mod-econ"
-    os.makedirs(os.path.join(output_folder, 'economy'), exist_ok=True)
+    sink.make_folders(output_folder, ['economy'])
+
+    # The all-maps economy page carries a vm-stats-game container for every map;
+    # a map's own ?game=<id> page is only requested when its container is missing.
+    requests_avoided = 0
 
     for map_name, map_id in map_ids.items():
         print(f"Processing economy data for: {map_name}")
 
-        map_soup = fetch_soup(match_url + f"?game={map_id}&tab=economy", headers)
-        map_container = map_soup.find("div", class_="vm-stats-game", attrs={"data-game-id": map_id})
+        map_container = soup.find("div", class_="vm-stats-game", attrs={"data-game-id": map_id})
+        if map_container and map_container.find("table", class_=econ_table_class):
+            if map_id != "all":
+                requests_avoided += 1
+        else:
+            map_soup = memo.get_soup(match_url + f"?game={map_id}&tab=economy")
+            if map_soup is None:
+                print(f"No economy data found for {map_name}")
+                continue
+            map_container = map_soup.find("div", class_="vm-stats-game", attrs={"data-game-id": map_id})
         if not map_container:
             print(f"No economy data found for {map_name}")
             continue
@@ -294,29 +336,33 @@ def fetch_economy_data(match_url, output_folder):
 
         if len(tables) > 0:
             output_file = os.path.join(output_folder, 'economy', f"{map_name}_economy.csv")
-            save_table_data(tables[0], output_file)
+            save_table_data(tables[0], output_file, sink)
 
         if len(tables) > 1:
             output_file = os.path.join(output_folder, 'economy', f"{map_name}_rounds_economy.csv")
-            save_table_data(tables[1], output_file)
+            save_table_data(tables[1], output_file, sink)
         else:
             print(f"No round-by-round economy table found for {map_name}.")
 
-    print("Economy data fetching complete!")
+    print(f"Economy data fetching complete! ({requests_avoided} per-map requests avoided)")
 
 
-def fetch_performance_data(match_url, output_folder):
+def fetch_performance_data(match_url, output_folder, memo=None, sink=None):
     """Scrapes performance data and saves to CSV."""
+    memo = memo or PageMemo()
+    sink = sink or sinks.OUTPUT_SINK
+
     # Make sure URL ends with a slash
     if not match_url.endswith('/'):
         match_url += '/'
 
     extension = "?game=all&tab=performance"
     url = match_url + extension
-    # Headers handled by fetch_url
 
-    response = fetch_url(url)
-    soup = BeautifulSoup(response.text, "html.parser")
+    soup = memo.get_soup(url)
+    if soup is None:
+        print("Failed to fetch the performance page.")
+        return
 
     map_tabs = soup.find_all("div", class_="vm-stats-gamesnav-item js-map-switch")
     map_ids = {}
@@ -347,14 +393,14 @@ def fetch_performance_data(match_url, output_folder):
             table = map_container.find("table", class_=class_name)
             if table:
                 output_file = os.path.join(output_folder, 'performance', f"{map_name}_{category}.csv")
-                save_table_data(table, output_file)
+                save_table_data(table, output_file, sink)
             else:
                 print(f"No {category} table found for {map_name}.")
 
         adv_stats_table = map_container.find("table", class_="wf-table-inset mod-adv-stats")
         if adv_stats_table:
             output_file = os.path.join(output_folder, 'performance', f"{map_name}_advanced_stats.csv")
-            save_table_data(adv_stats_table, output_file)
+            save_table_data(adv_stats_table, output_file, sink)
         else:
             print(f"No advanced stats table found for {map_name}.")
 
@@ -363,11 +409,11 @@ def fetch_soup(url, headers=None):
     """Fetch the HTML content and return BeautifulSoup object."""
     response = fetch_url(url)
     if response:
-        return BeautifulSoup(response.text, "html.parser")
+        return parse_html(response.text)
     return None
 
 
-def save_table_data(table, filename):
+def save_table_data(table, filename, sink=None):
     """Save table data to CSV file."""
     rows = []
     for tr in table.find_all("tr"):
@@ -376,64 +422,120 @@ def save_table_data(table, filename):
         if row:
             rows.append(row)
 
-    df = pd.DataFrame(rows)
-    df.to_csv(filename, index=False, header=False)
+    (sink or sinks.OUTPUT_SINK).write_table(filename, rows)
     print(f"Data saved to {filename}")
 
 
-def process_match(match_url, skip_types=None, base_path=None, check_existing=False):
-    """Main function to process a single match"""
-    if skip_types is None:
-        skip_types = []
+def match_page_urls(match_url, skip_types=()):
+    """Every page the extractors (minus skip_types) read for a match, as the memo keys them."""
+    tab_base = match_url if match_url.endswith('/') else match_url + '/'
+    urls = [match_url]
+    if 'economy' not in skip_types:
+        urls.append(tab_base + "?game=all&tab=economy")
+    if 'performance' not in skip_types:
+        urls.append(tab_base + "?game=all&tab=performance")
+    return urls
 
-    # Create folder structure
-    output_folder = create_folder_structure(match_url, base_path)
+
+MATCH_EXTRACTORS = [
+    ('veto', "Map Veto Data", fetch_map_veto),
+    ('stats', "Player Stats", fetch_player_stats),
+    ('rounds', "Round Data", fetch_round_data),
+    ('economy', "Economy Data", fetch_economy_data),
+    ('performance', "Performance Data", fetch_performance_data),
+]
+
+
+def match_already_scraped(output_folder):
+    """True if the match folder already has its player stats (in any output format)."""
+    # Check if a critical file exists, e.g., All_Maps.csv in player_stats
+    # Also check for veto or just rely on stats? Stats is most important.
+    return any(os.path.exists(os.path.join(output_folder, marker)) for marker in sinks.SCRAPED_MARKERS)
+
+
+async def prepare_match_async(match_url, base_path=None, check_existing=False, memo=None):
+    """
+    Creates the match's output folder. Returns the folder, or None when the
+    match page failed or (with check_existing) the match is already scraped.
+    """
+    output_folder = await run_blocking(create_folder_structure, match_url, base_path, memo)
     if not output_folder:
         print(f"Failed to create folder structure for {match_url}")
-        return
+        return None
 
-    if check_existing:
-        # Check if a critical file exists, e.g., All_Maps.csv in player_stats
-        common_file = os.path.join(output_folder, 'player_stats', 'All_Maps.csv')
-        # Also check for veto or just rely on stats? Stats is most important.
-        if os.path.exists(common_file):
-            print(f"Skipping match (Data exists): {output_folder}")
-            return
+    if check_existing and match_already_scraped(output_folder):
+        print(f"Skipping match (Data exists): {output_folder}")
+        return None
+
+    if utils.ARCHIVE is not None:
+        utils.ARCHIVE.record_match(match_url, os.path.relpath(base_path) if base_path else "")
 
     print(f"Saving all data to: {output_folder}")
+    return output_folder
 
-    # Fetch each type of data
-    if 'veto' not in skip_types:
-        print("\n===== Fetching Map Veto Data =====")
-        fetch_map_veto(match_url, output_folder)
 
-    if 'stats' not in skip_types:
-        print("\n===== Fetching Player Stats =====")
-        fetch_player_stats(match_url, output_folder)
+async def process_match_async(match_url, skip_types=None, base_path=None, check_existing=False):
+    """Main coroutine to process a single match; the extractors run concurrently."""
+    if skip_types is None:
+        skip_types = []
 
-    if 'rounds' not in skip_types:
-        print("\n===== Fetching Round Data =====")
-        fetch_round_data(match_url, output_folder)
+    from parse_pool import POOL
+    if POOL is not None:
+        # Fetch here, parse and extract in the process pool
+        result = await POOL.process_match(match_url, base_path, skip_types, check_existing)
+        if result and result['errors']:
+            raise RuntimeError("; ".join(result['errors']))
+        if result:
+            print("\nAll requested data has been scraped successfully!")
+        return
 
-    if 'economy' not in skip_types:
-        print("\n===== Fetching Economy Data =====")
-        fetch_economy_data(match_url, output_folder)
+    # Every extractor reads from the same memo, so each page is fetched and parsed once
+    memo = PageMemo()
 
-    if 'performance' not in skip_types:
-        print("\n===== Fetching Performance Data =====")
-        fetch_performance_data(match_url, output_folder)
+    output_folder = await prepare_match_async(match_url, base_path, check_existing, memo)
+    if not output_folder:
+        return
+
+    # Fetch each type of data; each extractor holds one request slot at a time
+    tasks = []
+    for data_type, label, extractor in MATCH_EXTRACTORS:
+        if data_type not in skip_types:
+            print(f"\n===== Fetching {label} =====")
+            tasks.append(run_blocking(extractor, match_url, output_folder, memo))
+    # Let every extractor finish writing before the sink closes the match
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    sinks.OUTPUT_SINK.finish_match(output_folder)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
 
     print("\nAll requested data has been scraped successfully!")
 
 
+def process_match(match_url, skip_types=None, base_path=None, check_existing=False):
+    """Main function to process a single match"""
+    return asyncio.run(process_match_async(match_url, skip_types, base_path, check_existing))
+
+
 def main():
     parser = argparse.ArgumentParser(description='Scrape VLR.gg match data.')
     parser.add_argument('url', help='URL of the VLR.gg match to scrape')
     parser.add_argument('--skip', nargs='+', choices=['veto', 'stats', 'rounds', 'economy', 'performance'],
                         help='Skip specific data types')
+    from parse_pool import add_pool_args, apply_pool_args, print_pool_report
+    add_http_args(parser)
+    add_parser_args(parser)
+    add_pool_args(parser)
+    sinks.add_output_args(parser)
 
     args = parser.parse_args()
+    apply_http_args(args)
+    apply_parser_args(args)
+    apply_pool_args(args)
+    sinks.apply_output_args(args)
     process_match(args.url, args.skip)
+    print_session_stats()
+    print_pool_report()
 
 
 if __name__ == "__main__":
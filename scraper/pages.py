@@ -0,0 +1,49 @@
+import re
+from threading import Lock, RLock
+from urllib.parse import urlparse
+from parsing import parse_html, parse_match_page
+from utils import fetch_url
+
+
+def is_match_url(url):
+    """True for vlr.gg match pages (/<match id>/<slug>), including their ?tab= variants."""
+    return re.match(r'^/\d+(/|$)', urlparse(url).path) is not None
+
+
+class PageMemo:
+    """
+    Per-run memo of fetched pages. Each URL is requested once and parsed
+    once, no matter how many extractors ask for it. Safe to share between
+    threads: concurrent callers for the same URL wait for the first one
+    instead of issuing their own request.
+    """
+
+    def __init__(self, fetch=None):
+        self._fetch = fetch or fetch_url
+        self._responses = {}   # url -> response (or None on failure)
+        self._soups = {}       # url -> BeautifulSoup (or None on failure)
+        self._url_locks = {}
+        self._lock = Lock()
+
+    def _url_lock(self, url):
+        with self._lock:
+            return self._url_locks.setdefault(url, RLock())
+
+    def get_response(self, url):
+        """Returns the response for `url`, fetching it on first use."""
+        with self._url_lock(url):
+            if url not in self._responses:
+                self._responses[url] = self._fetch(url)
+            return self._responses[url]
+
+    def get_soup(self, url):
+        """Returns the parsed page for `url`, or None if it could not be fetched."""
+        with self._url_lock(url):
+            if url not in self._soups:
+                response = self.get_response(url)
+                if not response or response.status_code != 200:
+                    self._soups[url] = None
+                else:
+                    parse = parse_match_page if is_match_url(url) else parse_html
+                    self._soups[url] = parse(response.text)
+            return self._soups[url]
@@ -0,0 +1,246 @@
+"""
+Process pool for the CPU side of scraping.
+
+Fetching is I/O and runs on the fetch threads (utils.run_blocking), but
+parsing pages and walking their tables is CPU work that holds the GIL, so on
+its own a crawl never uses more than one core. With --parse-workers N the
+work is split by resource:
+
+    fetch threads   download every page a match needs (--concurrency of them)
+    parse processes build the soups and run the extractors, collecting their
+                    rows in a CollectSink instead of writing files
+    writer          replays the collected writes into the output tree, on a
+                    thread of its own so it never takes a fetch slot
+
+A throughput report at the end shows how busy each side was, so it's clear
+whether to raise --concurrency/--rate or --parse-workers. Busy time is
+measured where the work runs, so time spent queued for a free thread or
+process doesn't count.
+"""
+import io
+import os
+import time
+import asyncio
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import utils
+import sinks
+import parsing
+from pages import PageMemo
+from parsing import parse_match_header
+from sinks import CollectSink
+from utils import run_blocking
+from main_scrape import (match_folder, match_status, match_already_scraped, match_page_urls,
+                         create_folder_structure, MATCH_EXTRACTORS)
+
+# Rounds of "fetch what the extractors asked for" before giving up on a match
+MAX_FETCH_ROUNDS = 3
+
+POOL = None
+
+
+# ---- worker side (runs in the pool processes) ----
+
+def _init_worker(backend, targeted):
+    parsing.PARSER = backend
+    parsing.TARGETED_PARSE = targeted
+
+
+def _response(url, page):
+    from requests.models import Response
+
+    status_code, body, encoding = page
+    response = Response()
+    response.status_code = status_code
+    response.url = url
+    response._content = body
+    response.encoding = encoding
+    return response
+
+
+def _read_header(match_url, page, base_path):
+    """Output folder and status of a match from its page header alone, and the seconds it took."""
+    started = time.perf_counter()
+    status_code, body, encoding = page
+    soup = parse_match_header(body.decode(encoding or 'utf-8', 'replace'))
+    return match_folder(match_url, soup, base_path), match_status(soup), time.perf_counter() - started
+
+
+def _extract(match_url, pages, base_path, skip_types):
+    """
+    Runs the extractors over already-fetched pages. Returns the collected
+    writes, plus any URL an extractor wanted that wasn't in `pages`. Each
+    extractor runs on its own: one that raises is listed in 'errors' and
+    the tables the others wrote are kept.
+    """
+    started = time.perf_counter()
+    missing = []
+
+    def fetch(url):
+        if url in pages:
+            return _response(url, pages[url])
+        missing.append(url)
+        return None
+
+    memo = PageMemo(fetch=fetch)
+    sink = CollectSink()
+    log = io.StringIO()
+    result = {'folder': None, 'status': None, 'writes': sink, 'missing': missing, 'errors': []}
+    with contextlib.redirect_stdout(log):
+        folder = create_folder_structure(match_url, base_path, memo, sink)
+        if folder:
+            result['folder'] = folder
+            result['status'] = match_status(memo.get_soup(match_url))
+            for data_type, label, extractor in MATCH_EXTRACTORS:
+                if data_type not in skip_types:
+                    print(f"\n===== Fetching {label} =====")
+                    try:
+                        extractor(match_url, folder, memo, sink)
+                    except Exception as e:
+                        print(f"Error in {label}: {e}")
+                        result['errors'].append(f"{label}: {e}")
+            sink.finish_match(folder)
+    result['log'] = log.getvalue()
+    result['seconds'] = time.perf_counter() - started
+    return result
+
+
+# ---- parent side ----
+
+class ParsePool:
+    def __init__(self, workers):
+        self.workers = workers
+        self._executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                             initargs=(parsing.PARSER, parsing.TARGETED_PARSE))
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="writer")
+        self.started = time.monotonic()
+        # busy seconds and item counts per side, for the throughput report
+        self.busy = {"fetch": 0.0, "parse": 0.0, "write": 0.0}
+        self.items = {"fetch": 0, "parse": 0, "write": 0}
+
+    def close(self):
+        self._executor.shutdown()
+        self._writer.shutdown()
+
+    @staticmethod
+    def _timed_get(memo, url):
+        started = time.perf_counter()
+        response = memo.get_response(url)
+        return response, time.perf_counter() - started
+
+    async def _fetch(self, memo, url):
+        response, seconds = await run_blocking(self._timed_get, memo, url)
+        self.busy["fetch"] += seconds
+        self.items["fetch"] += 1
+        return response
+
+    async def _fetch_pages(self, memo, urls, pages):
+        responses = await asyncio.gather(*(self._fetch(memo, url) for url in urls))
+        for url, response in zip(urls, responses):
+            if response is not None:
+                pages[url] = (response.status_code, response.content, response.encoding)
+
+    async def _submit(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def _write(self, writes):
+        def replay():
+            started = time.perf_counter()
+            count = writes.replay(sinks.OUTPUT_SINK)
+            return count, time.perf_counter() - started
+
+        loop = asyncio.get_running_loop()
+        count, seconds = await loop.run_in_executor(self._writer, replay)
+        self.busy["write"] += seconds
+        self.items["write"] += count
+
+    async def process_match(self, match_url, base_path=None, skip_types=(), check_existing=False, final_only=False):
+        """
+        Fetches a match's pages, extracts them in the pool and writes the
+        result. Returns {'folder', 'status', 'skipped', 'errors'}, or None if
+        the match page could not be fetched; 'errors' lists the extractors
+        that raised. With check_existing an already scraped match is
+        skipped - only once it is final if `final_only`.
+        """
+        memo = PageMemo()
+        pages = {}
+        await self._fetch_pages(memo, [match_url], pages)
+        if pages.get(match_url, (None,))[0] != 200:
+            print("Failed to fetch the webpage.")
+            print(f"Failed to create folder structure for {match_url}")
+            return None
+
+        if check_existing:
+            folder, status, seconds = await self._submit(_read_header, match_url, pages[match_url], base_path)
+            self.busy["parse"] += seconds
+            if match_already_scraped(folder) and (status == "completed" or not final_only):
+                print(f"Skipping match (Data exists): {folder}")
+                return {'folder': folder, 'status': status, 'skipped': True, 'errors': []}
+
+        wanted = [url for url in match_page_urls(match_url, skip_types) if url not in pages]
+        for _ in range(MAX_FETCH_ROUNDS):
+            await self._fetch_pages(memo, wanted, pages)
+            result = await self._submit(_extract, match_url, pages, base_path, tuple(skip_types))
+            self.busy["parse"] += result['seconds']
+            self.items["parse"] += 1
+            # An extractor asked for a page we didn't prefetch (e.g. a per-map economy fallback)
+            wanted = [url for url in dict.fromkeys(result['missing']) if url not in pages]
+            if not wanted:
+                break
+
+        if utils.ARCHIVE is not None and result['folder']:
+            utils.ARCHIVE.record_match(match_url, os.path.relpath(base_path) if base_path else "")
+        await self._write(result['writes'])
+        print(f"Saving all data to: {result['folder']}")
+        print(result['log'], end="")
+        return {'folder': result['folder'], 'status': result['status'], 'skipped': False,
+                'errors': result['errors']}
+
+    def report(self):
+        """Share of each side's capacity that was in use, and which one limited the crawl."""
+        wall = max(time.monotonic() - self.started, 1e-9)
+        capacity = {"fetch": utils.CONCURRENCY, "parse": self.workers, "write": 1}
+        utilisation = {side: self.busy[side] / (capacity[side] * wall) for side in self.busy}
+        return {
+            "seconds": wall,
+            "busy": dict(self.busy),
+            "items": dict(self.items),
+            "capacity": capacity,
+            "utilisation": utilisation,
+            "bottleneck": max(utilisation, key=utilisation.get),
+        }
+
+
+def configure_parse_pool(workers):
+    """Starts a pool of `workers` parse processes, or stops it when 0/None."""
+    global POOL
+    if POOL is not None:
+        POOL.close()
+    POOL = ParsePool(workers) if workers else None
+
+
+def print_pool_report():
+    if POOL is None:
+        return
+    report = POOL.report()
+    units = {"fetch": "pages", "parse": "matches", "write": "files"}
+    print(f"Throughput over {report['seconds']:.1f}s:")
+    for side in ("fetch", "parse", "write"):
+        print(f"  {side:<6} {report['items'][side]:>6} {units[side]:<8} "
+              f"{report['capacity'][side]:>3} workers, {report['utilisation'][side]:.0%} busy")
+    hint = {"fetch": "raise --rate/--concurrency (or accept the polite rate)",
+            "parse": "raise --parse-workers", "write": "use a faster disk"}[report['bottleneck']]
+    print(f"  Bottleneck: {report['bottleneck']} - {hint}")
+
+
+def add_pool_args(parser):
+    """Adds --parse-workers to a scraper CLI."""
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help='Processes that parse pages and run the extractors while threads keep fetching '
+                             '(default: 0 = parse in the fetch threads)')
+
+
+def apply_pool_args(args):
+    configure_parse_pool(args.parse_workers)
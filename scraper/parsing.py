@@ -0,0 +1,293 @@
+"""
+HTML parser backends for the scrapers.
+
+Every extractor works on a BeautifulSoup tree; the backend only decides who
+tokenises the HTML and builds that tree:
+
+    html.parser   pure-Python stdlib parser (default, no extra install)
+    lxml          libxml2 via bs4's lxml tree builder   (pip install lxml)
+    selectolax    Lexbor HTML5 parser feeding bs4       (pip install selectolax)
+
+Pick one with --parser on any scraper CLI or the VLR_PARSER environment
+variable. Because the extractors never see the backend, the CSVs they write
+should be byte-identical whichever one is used; run this module directly on
+saved pages to check that and to compare parse and extractor times:
+
+    python scraper/parsing.py saved_match.html other_match.html --repeat 5
+
+Match pages are parsed in targeted mode by default: only the regions the
+extractors read (.match-header-*, .vm-stats-gamesnav and the .vm-stats-game
+containers) are turned into a tree, and navigation, comments and sidebars
+are skipped while parsing. --full-parse (or VLR_TARGETED_PARSE=0) turns it
+off. The benchmark reports parse time and peak memory for both modes.
+"""
+import os
+import sys
+import time
+import filecmp
+import tempfile
+import argparse
+import tracemalloc
+from bs4 import BeautifulSoup, Comment, SoupStrainer
+from bs4.builder import HTMLTreeBuilder
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+BACKENDS = ("html.parser", "lxml", "selectolax")
+PARSER = os.environ.get("VLR_PARSER", "html.parser")
+TARGETED_PARSE = os.environ.get("VLR_TARGETED_PARSE", "1") != "0"
+
+# Class prefixes of the match-page regions the extractors read
+MATCH_PAGE_REGIONS = ("match-header", "vm-stats-game")
+
+
+def _in_match_regions(class_value):
+    # bs4 passes either a single class or the whole class attribute depending on version
+    return bool(class_value) and any(c.startswith(MATCH_PAGE_REGIONS) for c in class_value.split())
+
+
+MATCH_PAGE_STRAINER = SoupStrainer(class_=_in_match_regions)
+MATCH_HEADER_STRAINER = SoupStrainer(
+    class_=lambda value: bool(value) and any(c.startswith("match-header") for c in value.split()))
+
+
+class LexborTreeBuilder(HTMLTreeBuilder):
+    """
+    bs4 tree builder that parses with selectolax's Lexbor engine and replays
+    the resulting DOM into BeautifulSoup, the same way bs4's lxml builder
+    replays libxml2 events.
+    """
+    NAME = "selectolax"
+    features = [NAME, "html", "fast"]
+    is_xml = False
+
+    def feed(self, markup):
+        if isinstance(markup, bytes):
+            markup = markup.decode("utf-8", "replace")
+        soup = self.soup
+        tree = LexborHTMLParser(markup)
+
+        # Iterative walk: (node, closing) pairs so deep pages can't hit the recursion limit
+        stack = [(tree.root, False)]
+        while stack:
+            node, closing = stack.pop()
+            if closing:
+                soup.handle_endtag(node.tag)
+                continue
+
+            tag = node.tag
+            if tag == "-text":
+                soup.handle_data(node.text_content)
+            elif tag == "-comment":
+                soup.endData()
+                soup.handle_data(node.comment_content or "")
+                soup.endData(Comment)
+            elif not tag.startswith(("-", "_", "#")):
+                attrs = {k: ("" if v is None else v) for k, v in node.attributes.items()}
+                soup.handle_starttag(tag, None, None, attrs)
+                stack.append((node, True))
+                children = list(node.iter(include_text=True))
+                stack.extend((child, False) for child in reversed(children))
+
+
+def available_backends():
+    """Backends whose optional dependency is installed."""
+    available = ["html.parser"]
+    try:
+        import lxml  # noqa: F401
+        available.append("lxml")
+    except ImportError:
+        pass
+    if LexborHTMLParser is not None:
+        available.append("selectolax")
+    return available
+
+
+def set_backend(name):
+    """Selects the parser backend used by parse_html."""
+    global PARSER
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown parser backend {name!r}; choose one of {', '.join(BACKENDS)}")
+    if name not in available_backends():
+        raise ImportError(f"Parser backend {name!r} is not installed (pip install {name})")
+    PARSER = name
+
+
+def parse_html(text, backend=None, parse_only=None):
+    """Parses an HTML document into a BeautifulSoup tree with the selected backend."""
+    backend = backend or PARSER
+    if backend == "selectolax":
+        return BeautifulSoup(text, builder=LexborTreeBuilder(), parse_only=parse_only)
+    return BeautifulSoup(text, backend, parse_only=parse_only)
+
+
+def parse_match_page(text, backend=None, targeted=None):
+    """
+    Parses a match page. In targeted mode only the header and stats regions
+    are built into the tree; everything the extractors use is still there.
+    """
+    targeted = TARGETED_PARSE if targeted is None else targeted
+    return parse_html(text, backend, MATCH_PAGE_STRAINER if targeted else None)
+
+
+def parse_match_header(text, backend=None):
+    """Parses only the .match-header-* part of a match page (teams, event, status note)."""
+    return parse_html(text, backend, MATCH_HEADER_STRAINER)
+
+
+def add_parser_args(parser):
+    """Adds the --parser option to a scraper CLI."""
+    parser.add_argument('--parser', choices=BACKENDS, default=PARSER,
+                        help=f'HTML parser backend (default: {PARSER}, or $VLR_PARSER)')
+    parser.add_argument('--full-parse', action='store_true', default=not TARGETED_PARSE,
+                        help='Parse whole match pages instead of only the regions the extractors read')
+
+
+def apply_parser_args(args):
+    global TARGETED_PARSE
+    set_backend(args.parser)
+    TARGETED_PARSE = not args.full_parse
+
+
+# ============================================================
+# Benchmark / parity check over saved pages
+# ============================================================
+
+def _offline_memo(html):
+    """A PageMemo that answers every URL with the saved page."""
+    from requests.models import Response
+    from pages import PageMemo
+
+    def fetch(url):
+        response = Response()
+        response.status_code = 200
+        response.url = url
+        response._content = html.encode("utf-8")
+        response.encoding = "utf-8"
+        return response
+
+    return PageMemo(fetch=fetch)
+
+
+def _extractors():
+    import main_scrape
+    return (main_scrape.fetch_map_veto, main_scrape.fetch_player_stats,
+            main_scrape.fetch_round_data, main_scrape.fetch_economy_data,
+            main_scrape.fetch_performance_data)
+
+
+def _extract_all(html, output_folder, memo=None):
+    """Runs every match extractor over one saved page."""
+    import contextlib
+    import io
+
+    url = "https://www.vlr.gg/0/saved-page"
+    for sub in ('map_veto', 'player_stats', 'rounds', 'economy', 'performance'):
+        os.makedirs(os.path.join(output_folder, sub), exist_ok=True)
+    memo = memo or _offline_memo(html)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for extractor in _extractors():
+            extractor(url, output_folder, memo)
+
+
+def _time_extractors(html, repeat):
+    """Average ms per extractor on an already-parsed page (parse time excluded)."""
+    import contextlib
+    import io
+
+    url = "https://www.vlr.gg/0/saved-page"
+    memo = _offline_memo(html)
+    timings = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        _extract_all(html, tmp, memo)  # parses the page once and creates the folders
+        with contextlib.redirect_stdout(io.StringIO()):
+            for extractor in _extractors():
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    extractor(url, tmp, memo)
+                timings[extractor.__name__] = (time.perf_counter() - start) * 1000 / repeat
+    return timings
+
+
+def _measure(html, backend, targeted, repeat):
+    """Average parse time (ms) and peak traced memory (MB) for one configuration."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parse_match_page(html, backend, targeted)
+    elapsed = (time.perf_counter() - start) * 1000 / repeat
+
+    tracemalloc.start()
+    soup = parse_match_page(html, backend, targeted)
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    del soup
+    return elapsed, peak
+
+
+def _diff_trees(left, right):
+    """Relative paths of files that differ or exist on one side only."""
+    comparison = filecmp.dircmp(left, right)
+    diffs = comparison.left_only + comparison.right_only
+    for name in comparison.common_files:
+        if not filecmp.cmp(os.path.join(left, name), os.path.join(right, name), shallow=False):
+            diffs.append(name)
+    for sub, sub_cmp in comparison.subdirs.items():
+        diffs.extend(os.path.join(sub, d) for d in _diff_trees(sub_cmp.left, sub_cmp.right))
+    return diffs
+
+
+def bench(paths, repeat=3, backends=None):
+    """
+    Times each backend, in full and targeted mode, on each page, times each
+    extractor on the parsed page, and checks the extracted CSVs match
+    html.parser with a full parse.
+    """
+    import parsing  # the module instance pages.py uses, even when run as a script
+
+    backends = backends or available_backends()
+    configs = [(b, t) for b in backends for t in (False, True)]
+    parity_ok = True
+    print(f"{'page':<24} {'backend':<12} {'mode':<9} {'ms/parse':>9} {'peak MB':>8}")
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        for backend, targeted in configs:
+            elapsed, peak = _measure(html, backend, targeted, repeat)
+            print(f"{os.path.basename(path)[:24]:<24} {backend:<12} {'targeted' if targeted else 'full':<9} "
+                  f"{elapsed:>9.1f} {peak:>8.1f}")
+        for name, elapsed in _time_extractors(html, repeat).items():
+            print(f"  {name:<34} {elapsed:>9.2f} ms")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            previous = parsing.PARSER, parsing.TARGETED_PARSE
+            try:
+                for backend, targeted in configs:
+                    parsing.PARSER, parsing.TARGETED_PARSE = backend, targeted
+                    _extract_all(html, os.path.join(tmp, f"{backend}-{targeted}"))
+            finally:
+                parsing.PARSER, parsing.TARGETED_PARSE = previous
+            reference = f"{configs[0][0]}-{configs[0][1]}"
+            for backend, targeted in configs[1:]:
+                diffs = _diff_trees(os.path.join(tmp, reference), os.path.join(tmp, f"{backend}-{targeted}"))
+                if diffs:
+                    parity_ok = False
+                    mode = 'targeted' if targeted else 'full'
+                    print(f"  {backend} ({mode}): {len(diffs)} file(s) differ from {reference}: {diffs[:5]}")
+    print("CSV parity: OK" if parity_ok else "CSV parity: MISMATCH")
+    return parity_ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare HTML parser backends on saved VLR pages.')
+    parser.add_argument('pages', nargs='+', help='Saved match page HTML files')
+    parser.add_argument('--repeat', type=int, default=3, help='Parses per page per backend')
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, help='Backends to compare (default: all installed)')
+    args = parser.parse_args()
+    sys.exit(0 if bench(args.pages, args.repeat, args.backends) else 1)
+
+
+if __name__ == "__main__":
+    main()
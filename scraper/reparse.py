@@ -0,0 +1,107 @@
+"""
+Rebuilds the VCT Events/ CSV tree from a page archive, without the network.
+
+Crawl with --archive DIR first (any of the scraper CLIs), then:
+
+    python scraper/reparse.py DIR                     # rewrite ./VCT Events/ from DIR
+    python scraper/reparse.py DIR --output rebuilt --jobs 8
+
+Each archived match is re-extracted in a worker process (parsing is CPU
+bound, so this scales with cores); pages come from the archive through the
+same PageMemo the live scraper uses, so the extractors run unchanged.
+"""
+import os
+import io
+import sys
+import time
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import sinks
+import parsing
+from archive import PageArchive
+from pages import PageMemo
+from parsing import add_parser_args, apply_parser_args
+from main_scrape import create_folder_structure, MATCH_EXTRACTORS
+
+_ARCHIVE = None
+
+
+def _init_worker(archive_dir, backend, targeted, output_format):
+    global _ARCHIVE
+    _ARCHIVE = PageArchive(archive_dir)
+    parsing.PARSER = backend
+    parsing.TARGETED_PARSE = targeted
+    sinks.configure_output(output_format)
+
+
+def reparse_match(match_url, stage_folder, output_root, skip_types=()):
+    """
+    Re-extracts one archived match into output_root/stage_folder.
+    Returns the match folder, or None if its page is not in the archive.
+    """
+    memo = PageMemo(fetch=_ARCHIVE.fetch)
+    base_path = os.path.join(output_root, stage_folder) if stage_folder else output_root
+    # The extractors report progress with print; keep the workers quiet
+    with contextlib.redirect_stdout(io.StringIO()):
+        output_folder = create_folder_structure(match_url, base_path, memo)
+        if not output_folder:
+            return None
+        for data_type, label, extractor in MATCH_EXTRACTORS:
+            if data_type not in skip_types:
+                extractor(match_url, output_folder, memo)
+        sinks.OUTPUT_SINK.finish_match(output_folder)
+    return output_folder
+
+
+def reparse(archive_dir, output_root=".", jobs=None, skip_types=(), output_format="csv"):
+    """Re-extracts every match in the archive; returns (done, failed)."""
+    matches = PageArchive(archive_dir).matches()
+    print(f"Re-parsing {len(matches)} archived matches with {jobs or os.cpu_count()} processes")
+
+    start = time.monotonic()
+    done = failed = 0
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(archive_dir, parsing.PARSER, parsing.TARGETED_PARSE, output_format)) as pool:
+        futures = {
+            pool.submit(reparse_match, url, stage_folder, output_root, tuple(skip_types)): url
+            for url, stage_folder in matches
+        }
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                output_folder = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"Error re-parsing {url}: {e}")
+                continue
+            if output_folder is None:
+                failed += 1
+                print(f"Match page not in archive: {url}")
+            else:
+                done += 1
+
+    elapsed = time.monotonic() - start
+    print(f"Re-parsed {done}/{len(matches)} matches in {elapsed:.1f}s ({failed} failed)")
+    return done, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild the scraped CSVs from a page archive, offline.')
+    parser.add_argument('archive', help='Archive directory written with --archive')
+    parser.add_argument('--output', default='.', help='Directory to rebuild the tree in (default: current directory)')
+    parser.add_argument('--jobs', type=int, default=None, help='Worker processes (default: one per CPU)')
+    parser.add_argument('--skip', nargs='+', choices=['veto', 'stats', 'rounds', 'economy', 'performance'],
+                        default=[], help='Skip specific data types')
+    add_parser_args(parser)
+    sinks.add_output_args(parser)
+
+    args = parser.parse_args()
+    apply_parser_args(args)
+    done, failed = reparse(args.archive, args.output, args.jobs, args.skip, args.output_format)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,27 @@
-from utils import fetch_url
-from bs4 import BeautifulSoup
+from utils import fetch_url, run_blocking, add_http_args, apply_http_args, print_session_stats
 import argparse
+import asyncio
 import os
 import re
+import time
 from urllib.parse import urljoin
-from main_scrape import process_match
+from main_scrape import process_match_async
+from pages import PageMemo
+from parsing import parse_html, add_parser_args, apply_parser_args
+from parse_pool import add_pool_args, apply_pool_args, print_pool_report
+from sinks import add_output_args, apply_output_args
 from datetime import datetime
 
+# Matches scraped at the same time; all of them share utils' rate limit
+WORKERS = 1
+
+# Output tree, under the working directory: VCT Events/YEAR/EventName/Stage/
+EVENTS_DIR = "VCT Events"
+
+def events_root():
+    """Absolute path of this process's VCT Events/ folder."""
+    return os.path.join(os.getcwd(), EVENTS_DIR)
+
 def parse_event_year(soup):
     """
     Extract year from event dates by parsing .wf-subnav-item date strings.
@@ -35,18 +50,17 @@ def parse_event_year(soup):
     # Ultimate fallback: use current year
     return str(datetime.now().year)
 
-def get_event_stages(event_url):
+def get_event_stages(event_url, memo=None):
     """
     Extract all stages from an event (Group Stage, Playoffs, etc.).
     Returns list of tuples: (stage_name, stage_url)
     """
+    memo = memo or PageMemo()
     print(f"Fetching event stages from: {event_url}")
-    response = fetch_url(event_url)
-    if not response or response.status_code != 200:
+    soup = memo.get_soup(event_url)
+    if soup is None:
         print(f"Failed to fetch event page.")
         return []
-    
-    soup = BeautifulSoup(response.text, 'html.parser')
     stages = []
     
     # Look for subnav items which contain stages
@@ -71,6 +85,8 @@ def get_event_stages(event_url):
 def get_stage_matches(stage_url):
     """
     Get all match URLs from a specific stage page.
+    Returns None if the page could not be fetched, so callers can tell a
+    failed stage from one that has no matches.
     """
     # Ensure URL ends with /matches
     if '/matches' not in stage_url:
@@ -83,9 +99,9 @@ def get_stage_matches(stage_url):
     response = fetch_url(stage_url)
     if not response or response.status_code != 200:
         print(f"Failed to fetch stage page.")
-        return []
+        return None
     
-    soup = BeautifulSoup(response.text, 'html.parser')
+    soup = parse_html(response.text)
     match_urls = []
     
     # Find all match links
@@ -111,20 +127,70 @@ def get_stage_matches(stage_url):
     
     return match_urls
 
-def process_event(event_url, skip_types=None, check_existing=False):
+class MatchProgress:
+    """Counts finished matches and reports the throughput."""
+
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.started = time.monotonic()
+
+    def rate(self):
+        minutes = (time.monotonic() - self.started) / 60
+        return self.done / minutes if minutes > 0 else 0.0
+
+    def finish(self, url, error=None):
+        self.done += 1
+        if error is not None:
+            self.failed += 1
+            print(f"Error scraping match {url}: {error}")
+        print(f"Progress: {self.done}/{self.total} matches ({self.rate():.1f} matches/min)")
+
+
+async def process_matches_async(matches, skip_types, check_existing, workers=None):
     """
-    Process a VCT event with multiple stages.
+    Scrapes (url, stage_folder) pairs with up to `workers` matches in flight.
+    A failing match is reported and does not stop the others.
     """
-    if skip_types is None:
-        skip_types = []
-    
-    # Fetch main event page
-    response = fetch_url(event_url)
-    if not response or response.status_code != 200:
+    workers = max(1, workers or WORKERS)
+    queue = asyncio.Queue()
+    for item in matches:
+        queue.put_nowait(item)
+    progress = MatchProgress(len(matches))
+
+    async def worker():
+        while True:
+            try:
+                url, stage_folder = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            print(f"\nProcessing match: {url}")
+            try:
+                await process_match_async(url, skip_types, base_path=stage_folder, check_existing=check_existing)
+            except Exception as e:
+                progress.finish(url, e)
+            else:
+                progress.finish(url)
+
+    await asyncio.gather(*(worker() for _ in range(min(workers, len(matches)))))
+    if progress.total:
+        print(f"Scraped {progress.done - progress.failed}/{progress.total} matches "
+              f"({progress.failed} failed, {progress.rate():.1f} matches/min)")
+    return progress
+
+
+async def discover_event_async(event_url, memo=None):
+    """
+    Reads an event's name, year and stages.
+    Returns (event_folder, [(stage_name, stage_url), ...]) or None if the event page failed.
+    """
+    # Fetch main event page; get_event_stages reuses it through the memo
+    memo = memo or PageMemo()
+    soup = await run_blocking(memo.get_soup, event_url)
+    if soup is None:
         print(f"Failed to fetch event page: {event_url}")
-        return
-    
-    soup = BeautifulSoup(response.text, 'html.parser')
+        return None
     
     # Extract event name
     event_header = soup.select_one('.wf-title')
@@ -139,7 +205,7 @@ def process_event(event_url, skip_types=None, check_existing=False):
     print(f"Event: {event_name} | Year: {year}")
     
     # Get all stages
-    stages = get_event_stages(event_url)
+    stages = await run_blocking(get_event_stages, event_url, memo)
     
     if not stages:
         print(f"No stages found for event. Will try default /matches endpoint.")
@@ -149,14 +215,31 @@ def process_event(event_url, skip_types=None, check_existing=False):
     print(f"Found {len(stages)} stage(s): {[s[0] for s in stages]}")
     
     # Create base path: VCT Events/YEAR/EventName/
-    vct_base = os.path.join(os.getcwd(), "VCT Events", year, event_name)
+    vct_base = os.path.join(events_root(), year, event_name)
+    return vct_base, stages
+
+async def process_event_async(event_url, skip_types=None, check_existing=False, workers=None):
+    """
+    Process a VCT event with multiple stages.
+    Up to `workers` matches (default WORKERS) are scraped at once.
+    """
+    if skip_types is None:
+        skip_types = []
     
-    # Process each stage
-    for stage_name, stage_url in stages:
-        print(f"\n===== Processing Stage: {stage_name} =====")
-        
-        # Get matches for this stage
-        match_urls = get_stage_matches(stage_url)
+    event = await discover_event_async(event_url)
+    if event is None:
+        return
+    vct_base, stages = event
+    
+    # Stage match lists are independent pages, fetch them together
+    stage_matches = await asyncio.gather(
+        *(run_blocking(get_stage_matches, stage_url) for _, stage_url in stages)
+    )
+    
+    # Collect every stage's matches, then scrape them through one worker pool
+    matches = []
+    for (stage_name, stage_url), match_urls in zip(stages, stage_matches):
+        print(f"\n===== Stage: {stage_name} =====")
         
         if not match_urls:
             print(f"No matches found for stage: {stage_name}")
@@ -169,22 +252,36 @@ def process_event(event_url, skip_types=None, check_existing=False):
         if not os.path.exists(stage_folder):
             os.makedirs(stage_folder)
         
-        # Process each match
-        for i, url in enumerate(match_urls, 1):
-            print(f"\nProcessing match {i}/{len(match_urls)}: {url}")
-            try:
-                process_match(url, skip_types, base_path=stage_folder, check_existing=check_existing)
-            except Exception as e:
-                print(f"Error scraping match {url}: {e}")
+        matches.extend((url, stage_folder) for url in match_urls)
+    
+    await process_matches_async(matches, skip_types, check_existing, workers)
+
+def process_event(event_url, skip_types=None, check_existing=False, workers=None):
+    """
+    Process a VCT event with multiple stages.
+    """
+    return asyncio.run(process_event_async(event_url, skip_types, check_existing, workers))
 
 def main():
     parser = argparse.ArgumentParser(description='Scrape all matches from a VLR.gg event.')
     parser.add_argument('event_url', help='URL of the VLR.gg event')
     parser.add_argument('--skip', nargs='+', choices=['veto', 'stats', 'rounds', 'economy', 'performance'],
                         help='Skip specific data types')
+    parser.add_argument('--workers', type=int, default=WORKERS,
+                        help=f'Matches to scrape at the same time (default: {WORKERS})')
+    add_http_args(parser)
+    add_parser_args(parser)
+    add_pool_args(parser)
+    add_output_args(parser)
     
     args = parser.parse_args()
-    process_event(args.event_url, args.skip)
+    apply_http_args(args)
+    apply_parser_args(args)
+    apply_pool_args(args)
+    apply_output_args(args)
+    process_event(args.event_url, args.skip, workers=args.workers)
+    print_session_stats()
+    print_pool_report()
 
 if __name__ == "__main__":
     main()
@@ -1,61 +1,459 @@
 import argparse
-from bs4 import BeautifulSoup
-from utils import fetch_url
-from scrape_event import process_event
+import asyncio
+import socket
+import time
+import utils
+from utils import fetch_url_async, run_blocking, add_http_args, apply_http_args, print_session_stats
+from scrape_event import discover_event_async, get_stage_matches, events_root, WORKERS
+from main_scrape import prepare_match_async, match_already_scraped, match_status, MATCH_EXTRACTORS
+from frontier import Frontier, match_id_from_url, add_frontier_args, COMPLETED, LIVE, UPCOMING, LEASE_SECONDS
+from coordinator import RemoteFrontier
+from pages import PageMemo
+import parse_pool
+import sinks
+from parse_pool import add_pool_args, apply_pool_args, print_pool_report
+from parsing import parse_html, add_parser_args, apply_parser_args
 import os
 import re
 
-def scrape_global(start_page=1, end_page=6, check_existing=True):
+# tier=60 targets VCT (Tier 1) events, region=all for global coverage
+LISTING_URL = "https://www.vlr.gg/events/?tier=60&region=all&page="
+
+# Pipeline stages: how many coroutines work each one, and how many items may
+# wait in front of it. A full queue makes the stage before it wait, so
+# discovery runs ahead of extraction without racing through the whole site.
+STAGE_WORKERS = {"listing": 1, "event": 2, "stage": 2}
+QUEUE_SIZES = {"event": 32, "stage": 16, "match": 64, "tab": 32}
+
+# Distributed workers: seconds between polls of an empty work queue, and
+# between renewals of the leases a worker holds (well inside LEASE_SECONDS)
+POLL_SECONDS = 10
+RENEW_SECONDS = LEASE_SECONDS / 4
+
+# Status badge classes on listing event cards
+EVENT_STATUS_CLASSES = {"mod-completed": COMPLETED, "mod-ongoing": LIVE, "mod-upcoming": UPCOMING}
+
+def frontier_stage_folder(stage_folder):
+    """A stage folder as the frontier stores it: relative to the VCT Events root."""
+    return os.path.relpath(stage_folder, events_root())
+
+def local_stage_folder(stored):
+    """Resolves a frontier stage folder against this process's VCT Events root."""
+    return os.path.join(events_root(), stored)
+
+def event_status(link):
+    """'completed', 'live' or 'upcoming' from an event card's status badge; None if it has none."""
+    badge = link.select_one('.event-item-desc-item-status')
+    if badge is None:
+        return None
+    for css_class, status in EVENT_STATUS_CLASSES.items():
+        if css_class in badge.get('class', []):
+            return status
+    return {"completed": COMPLETED, "ongoing": LIVE, "upcoming": UPCOMING}.get(badge.text.strip().lower())
+
+def scan_listing_page(soup):
     """
-    Iterates through VLR events pages and triggers scraping for each.
+    Returns (title, event_url, status) for every event on a listing page.
+    """
+    events = []
+    for link in soup.select('a.event-item'):
+        href = link.get('href')
+        if not href:
+            continue
+
+        # Construct full URL
+        # href is typically /event/1234/event-name
+        full_event_url = f"https://www.vlr.gg{href}"
+
+        cleaned_title = "Unknown Event"
+        title_div = link.select_one('.event-item-title')
+        if title_div:
+            cleaned_title = title_div.text.strip()
+        events.append((cleaned_title, full_event_url, event_status(link)))
+    return events
+
+class MatchJob:
+    """Tracks the extractor tabs of one match still queued or running."""
+
+    def __init__(self, url, output_folder, remaining):
+        self.url = url
+        self.output_folder = output_folder
+        self.remaining = remaining
+        self.errors = []
+
+class CrawlPipeline:
+    """
+    listing -> event -> stage -> match -> tab, one asyncio queue between each
+    pair of stages. Every stage has its own workers, so the next listing page
+    and event are being discovered while earlier matches are still being
+    extracted, and the fetch pool never waits for a whole level to finish.
+
+    With a Frontier, every match's progress is recorded as it goes and
+    matches it already has as extracted are skipped before any request.
+    With `discover_only` matches are only recorded there, for distributed
+    workers (run_leased) to pick up.
     """
-    # tier=60 targets VCT (Tier 1) events, region=all for global coverage
-    base_url = "https://www.vlr.gg/events/?tier=60&region=all&page="
-    
-    for page in range(start_page, end_page + 1):
+
+    def __init__(self, skip_types=None, check_existing=True, workers=None, frontier=None, discover_only=False):
+        self.skip_types = skip_types or []
+        self.check_existing = check_existing
+        self.frontier = frontier
+        self.discover_only = discover_only
+        self.leased = 0         # matches leased as a distributed worker
+        self.queued = set()     # match ids queued during this run
+        self.skipped = 0        # matches skipped on the frontier's word alone
+        self.skipped_events = 0 # completed events skipped without a request
+        self.seen_events = set()
+        self.completed_events = []
+        self.stages_left = {}   # event url -> stage pages not loaded yet this run
+        self.workers = {
+            **STAGE_WORKERS,
+            "match": max(1, workers or WORKERS),
+            # Enough extractor slots to keep every fetch thread busy
+            "tab": max(utils.CONCURRENCY, 1),
+        }
+        self.queues = {
+            "listing": asyncio.Queue(),
+            **{name: asyncio.Queue(maxsize=size) for name, size in QUEUE_SIZES.items()},
+        }
+        self.handlers = {
+            "listing": self.handle_listing,
+            "event": self.handle_event,
+            "stage": self.handle_stage,
+            "match": self.handle_match,
+            "tab": self.handle_tab,
+        }
+        self.counts = {name: 0 for name in self.handlers}
+        self.failures = {name: 0 for name in self.handlers}
+
+    async def handle_listing(self, page):
         print(f"\n===== Scanning Events Page {page} =====")
-        url = base_url + str(page)
-        
-        response = fetch_url(url)
+        response = await fetch_url_async(LISTING_URL + str(page))
         if not response:
             print(f"Skipping page {page} due to fetch failure.")
-            continue
-            
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Selector for event items
-        event_links = soup.select('a.event-item')
-        
-        print(f"Found {len(event_links)} events on page {page}.")
-        
-        for link in event_links:
-            href = link.get('href')
-            if not href:
+            return
+
+        soup = await run_blocking(parse_html, response.text)
+        events = scan_listing_page(soup)
+        print(f"Found {len(events)} events on page {page}.")
+        for title, event_url, status in events:
+            if event_url in self.seen_events:
                 continue
-            
-            # Construct full URL
-            # href is typically /event/1234/event-name
-            full_event_url = f"https://www.vlr.gg{href}"
-            
-            cleaned_title = "Unknown Event"
-            title_div = link.select_one('.event-item-title')
-            if title_div:
-                cleaned_title = title_div.text.strip()
-            
-            print(f"Global: Discovered event {cleaned_title} ({full_event_url})")
-            
+            self.seen_events.add(event_url)
+            if self.frontier:
+                if (self.check_existing and status == COMPLETED
+                        and await run_blocking(self.frontier.is_event_done, event_url)):
+                    self.skipped_events += 1
+                    continue
+                await run_blocking(self.frontier.record_event, event_url, status)
+                if status == COMPLETED:
+                    self.completed_events.append(event_url)
+            print(f"Global: Discovered event {title} ({event_url}) [{status or 'unknown'}]")
+            await self.queues["event"].put(event_url)
+
+    async def handle_event(self, event_url):
+        event = await discover_event_async(event_url)
+        if event is None:
+            return
+        vct_base, stages = event
+        self.stages_left[event_url] = len(stages)
+        for stage_name, stage_url in stages:
+            await self.queues["stage"].put((stage_name, stage_url, os.path.join(vct_base, stage_name), event_url))
+
+    async def handle_stage(self, item):
+        stage_name, stage_url, stage_folder, event_url = item
+        match_urls = await run_blocking(get_stage_matches, stage_url)
+        if match_urls is None:
+            # The event stays unfinished: this stage's matches are unknown
+            return
+        if not match_urls:
+            print(f"No matches found for stage: {stage_name}")
+        else:
+            print(f"Found {len(match_urls)} matches in {stage_name}")
+            os.makedirs(stage_folder, exist_ok=True)
+        for url in match_urls:
+            if self.frontier:
+                await run_blocking(self.frontier.discover, url, frontier_stage_folder(stage_folder), event_url)
+            await self.enqueue_match(url, stage_folder)
+        self.stages_left[event_url] -= 1
+
+    async def enqueue_match(self, url, stage_folder):
+        match_id = match_id_from_url(url)
+        if match_id in self.queued:
+            return
+        self.queued.add(match_id)
+        if self.check_existing and self.frontier and await run_blocking(self.frontier.is_immutable, url):
+            self.skipped += 1
+            return
+        if self.discover_only:
+            # Live and upcoming matches extracted before go back in the work queue
+            await run_blocking(self.frontier.reopen, url)
+            return
+        await self.queues["match"].put((url, stage_folder))
+
+    async def handle_match(self, item):
+        url, stage_folder = item
+        if parse_pool.POOL is not None:
+            return await self.handle_match_in_pool(url, stage_folder)
+        memo = PageMemo()
+        output_folder = await prepare_match_async(url, stage_folder, memo=memo)
+        if not output_folder:
+            if self.frontier:
+                await run_blocking(self.frontier.mark_failed, url, "match page could not be fetched",
+                                   attempt=True)
+            return
+
+        # The match page is in the memo already, so this costs no request
+        status = match_status(memo.get_soup(url))
+        if self.check_existing and match_already_scraped(output_folder) and status == COMPLETED:
+            print(f"Skipping match (Data exists): {output_folder}")
+            if self.frontier:
+                await run_blocking(self.frontier.mark_extracted, url, output_folder, status)
+            return
+
+        if self.frontier:
+            await run_blocking(self.frontier.mark_fetched, url, output_folder, status)
+        tabs = [(label, extractor) for data_type, label, extractor in MATCH_EXTRACTORS
+                if data_type not in self.skip_types]
+        job = MatchJob(url, output_folder, len(tabs))
+        if not tabs:
+            await self.finish_match(job)
+        for label, extractor in tabs:
+            await self.queues["tab"].put((label, extractor, job, memo))
+
+    async def handle_match_in_pool(self, url, stage_folder):
+        """Fetches here, extracts in the parse pool; the tab stage isn't used."""
+        try:
+            result = await parse_pool.POOL.process_match(url, stage_folder, self.skip_types,
+                                                         self.check_existing, final_only=True)
+        except Exception as e:
+            if self.frontier:
+                await run_blocking(self.frontier.mark_failed, url, str(e), attempt=True)
+            raise
+        if not self.frontier:
+            return
+        if result is None:
+            await run_blocking(self.frontier.mark_failed, url, "match page could not be fetched", attempt=True)
+            return
+        if not result['skipped']:
+            await run_blocking(self.frontier.mark_fetched, url, result['folder'], result['status'])
+        if result['errors']:
+            # Same as a failed tab in thread mode: the other extractors' tables are written
+            await run_blocking(self.frontier.mark_failed, url, "; ".join(result['errors']), attempt=True)
+        else:
+            await run_blocking(self.frontier.mark_extracted, url, result['folder'], result['status'])
+
+    async def handle_tab(self, item):
+        label, extractor, job, memo = item
+        try:
+            await run_blocking(extractor, job.url, job.output_folder, memo)
+        except Exception as e:
+            job.errors.append(f"{label}: {e}")
+            raise
+        finally:
+            job.remaining -= 1
+            if job.remaining == 0:
+                await self.finish_match(job)
+
+    async def finish_match(self, job):
+        """Called once the last tab of a match is done."""
+        await run_blocking(sinks.OUTPUT_SINK.finish_match, job.output_folder)
+        if not self.frontier:
+            return
+        if job.errors:
+            await run_blocking(self.frontier.mark_failed, job.url, "; ".join(job.errors), attempt=True)
+        else:
+            await run_blocking(self.frontier.mark_extracted, job.url, job.output_folder)
+
+    async def worker(self, name):
+        queue, handler = self.queues[name], self.handlers[name]
+        while True:
+            item = await queue.get()
+            try:
+                await handler(item)
+                self.counts[name] += 1
+            except Exception as e:
+                self.failures[name] += 1
+                print(f"Error in {name} stage for {item[0] if isinstance(item, tuple) else item}: {e}")
+            finally:
+                queue.task_done()
+
+    def start_workers(self):
+        return [
+            asyncio.create_task(self.worker(name))
+            for name, count in self.workers.items()
+            for _ in range(count)
+        ]
+
+    async def stop_workers(self, workers):
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    def print_counts(self):
+        print("\nPipeline: " + ", ".join(
+            f"{self.counts[name]} {name}" + (f" ({self.failures[name]} failed)" if self.failures[name] else "")
+            for name in self.handlers
+        ))
+
+    async def run(self, pages, resume=False):
+        workers = self.start_workers()
+        try:
+            if resume and self.frontier:
+                pending = await run_blocking(self.frontier.pending)
+                print(f"Resuming {len(pending)} unfinished matches from {self.frontier.path}")
+                for url, stage_folder in pending:
+                    await self.enqueue_match(url, local_stage_folder(stage_folder))
+            for page in pages:
+                self.queues["listing"].put_nowait(page)
+            # Upstream stages only enqueue before marking an item done, so once a
+            # queue has drained nothing more can arrive at the ones after it
+            for name in self.handlers:
+                await self.queues[name].join()
+        finally:
+            await self.stop_workers(workers)
+
+        self.print_counts()
+        if self.frontier:
+            # Completed events whose matches are now all final and extracted won't be crawled again,
+            # as long as their event page and every stage page loaded this run
+            finished = 0
+            for url in self.completed_events:
+                if self.stages_left.get(url) == 0:
+                    finished += await run_blocking(self.frontier.finish_event, url)
+            counts = await run_blocking(self.frontier.counts)
+            event_counts = await run_blocking(self.frontier.event_counts)
+            print(f"Frontier: {self.skipped_events} completed events and {self.skipped} matches skipped "
+                  f"without a request; {finished} events finished this run, "
+                  f"{event_counts['done']}/{event_counts['events']} events done; " + ", ".join(
+                      f"{counts[state]} {state}" for state in sorted(counts)))
+
+    async def renew_leases(self, owner, every=RENEW_SECONDS):
+        """Keeps the leases of a batch alive for as long as the worker takes to get through it."""
+        while True:
+            await asyncio.sleep(every)
             try:
-                # We enable check_existing to skip matches we already have
-                process_event(full_event_url, check_existing=check_existing)
+                # Not on the fetch threads: they may all be sleeping out a rate-limit pause
+                await asyncio.to_thread(self.frontier.renew, owner)
             except Exception as e:
-                print(f"Error processing event {full_event_url}: {e}")
+                print(f"Could not renew the leases of {owner}: {e}")
+
+    async def run_leased(self, owner, batch=None, wait=0, poll=POLL_SECONDS):
+        """
+        Works as one node of a distributed crawl: leases batches of matches
+        from the frontier (a Frontier on a shared volume, or a RemoteFrontier)
+        and extracts them until none are left, polling for `wait` more
+        seconds in case discovery is still adding some.
+        """
+        batch = batch or 2 * self.workers["match"]
+        workers = self.start_workers()
+        heartbeat = asyncio.create_task(self.renew_leases(owner))
+        idle_since = time.monotonic()
+        try:
+            while True:
+                units = await run_blocking(self.frontier.lease, owner, batch)
+                if not units:
+                    if time.monotonic() - idle_since >= wait:
+                        break
+                    await asyncio.sleep(poll)
+                    continue
+                self.leased += len(units)
+                print(f"\n===== Leased {len(units)} matches ({self.leased} so far) =====")
+                for url, stage_folder in units:
+                    await self.queues["match"].put((url, local_stage_folder(stage_folder)))
+                await self.queues["match"].join()
+                await self.queues["tab"].join()
+                idle_since = time.monotonic()
+        finally:
+            await self.stop_workers([heartbeat, *workers])
+
+        self.print_counts()
+        counts = await run_blocking(self.frontier.counts)
+        print(f"Worker {owner}: {self.leased} matches leased; queue now " + ", ".join(
+            f"{counts[state]} {state}" for state in sorted(counts)))
+
+async def scrape_global_async(start_page=1, end_page=6, check_existing=True, workers=None,
+                              frontier_path=None, resume=False, discover_only=False, shared_frontier=False):
+    """
+    Iterates through VLR events pages and triggers scraping for each.
+    With `frontier_path`, match progress is kept in that SQLite file (see frontier.py);
+    with `discover_only` the matches are only queued there for distributed workers.
+    """
+    frontier = Frontier(frontier_path, shared_frontier) if frontier_path else None
+    try:
+        pipeline = CrawlPipeline(check_existing=check_existing, workers=workers, frontier=frontier,
+                                 discover_only=discover_only)
+        await pipeline.run(range(start_page, end_page + 1), resume=resume)
+    finally:
+        if frontier:
+            frontier.close()
+    return pipeline
+
+def scrape_global(start_page=1, end_page=6, check_existing=True, workers=None, frontier_path=None, resume=False,
+                  discover_only=False, shared_frontier=False):
+    """
+    Iterates through VLR events pages and triggers scraping for each.
+    """
+    return asyncio.run(scrape_global_async(start_page, end_page, check_existing, workers, frontier_path, resume,
+                                           discover_only, shared_frontier))
+
+async def work_leased_async(frontier_path=None, coordinator=None, check_existing=True, workers=None,
+                            batch=None, wait=0, shared_frontier=False, coordinator_token=None):
+    """
+    Runs a distributed crawl worker against a frontier file or a coordinator URL.
+    """
+    if coordinator:
+        frontier = RemoteFrontier(coordinator, token=coordinator_token)
+    else:
+        frontier = Frontier(frontier_path, shared_frontier)
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    try:
+        pipeline = CrawlPipeline(check_existing=check_existing, workers=workers, frontier=frontier)
+        await pipeline.run_leased(owner, batch, wait)
+    finally:
+        frontier.close()
+    return pipeline
+
+def work_leased(frontier_path=None, coordinator=None, check_existing=True, workers=None, batch=None, wait=0,
+                shared_frontier=False, coordinator_token=None):
+    return asyncio.run(work_leased_async(frontier_path, coordinator, check_existing, workers, batch, wait,
+                                         shared_frontier, coordinator_token))
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Mass scrape VLR events.')
     parser.add_argument('--start', type=int, default=1, help='Start page number')
     parser.add_argument('--end', type=int, default=5, help='End page number')
     parser.add_argument('--force', action='store_true', help='Force re-scrape (disable check_existing)')
-    
+    parser.add_argument('--workers', type=int, default=WORKERS, help=f'Matches to scrape at the same time (default: {WORKERS})')
+    parser.add_argument('--discover-only', action='store_true',
+                        help='Only queue the matches found in the frontier, for --worker processes to scrape')
+    parser.add_argument('--worker', action='store_true',
+                        help='Scrape matches leased from the frontier (or --coordinator) instead of crawling listings')
+    parser.add_argument('--coordinator', metavar='URL', help='With --worker: lease matches from coordinator.py at URL')
+    parser.add_argument('--coordinator-token', metavar='TOKEN', help="The coordinator's --token, if it has one")
+    parser.add_argument('--batch', type=int, default=None,
+                        help='With --worker: matches to lease at a time (default: 2 x --workers)')
+    parser.add_argument('--wait', type=float, default=0,
+                        help='With --worker: keep polling an empty queue this many seconds before exiting')
+    add_frontier_args(parser)
+    add_http_args(parser)
+    add_parser_args(parser)
+    add_pool_args(parser)
+    sinks.add_output_args(parser)
+
     args = parser.parse_args()
-    
-    scrape_global(args.start, args.end, check_existing=(not args.force))
+    apply_http_args(args)
+    apply_parser_args(args)
+    apply_pool_args(args)
+    sinks.apply_output_args(args)
+
+    if args.worker:
+        work_leased(args.frontier, args.coordinator, check_existing=(not args.force), workers=args.workers,
+                    batch=args.batch, wait=args.wait, shared_frontier=args.shared_frontier,
+                    coordinator_token=args.coordinator_token)
+    else:
+        scrape_global(args.start, args.end, check_existing=(not args.force), workers=args.workers,
+                      frontier_path=args.frontier, resume=args.resume, discover_only=args.discover_only,
+                      shared_frontier=args.shared_frontier)
+    print_session_stats()
+    print_pool_report()
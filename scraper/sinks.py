@@ -0,0 +1,308 @@
+"""
+Where the extractors' rows go.
+
+Every extractor in main_scrape.py builds its rows and hands them to a sink
+instead of opening files itself:
+
+    CsvSink       writes the CSV files straight away (the default)
+    BundleSink    keeps a match's tables until the match is finished, then
+                  writes them all as one compressed file (--format bundle)
+    ArrowSink     the same, but parses the tables into typed records and
+                  writes one Arrow IPC file per kind of table (--format arrow)
+    CollectSink   keeps the writes in memory so a parse worker process can
+                  send them back to the process that owns the output tree,
+                  which replays them into the output sink
+
+Once every extractor of a match has run, `finish_match(folder)` is called
+on the sink; only BundleSink does anything with it.
+
+Run as a script to convert an existing CSV tree to bundles and compare the
+two layouts:
+
+    python scraper/sinks.py bundle "VCT Events"
+    python scraper/sinks.py arrow "VCT Events"
+"""
+import os
+import csv
+import sys
+import gzip
+import json
+import argparse
+from threading import Lock
+
+# File holding a match's tables in the bundle layout, inside its match folder
+BUNDLE_NAME = "match.json.gz"
+BUNDLE_VERSION = 1
+BUNDLE_LEVEL = 6
+
+
+class CsvSink:
+    """Writes CSVs to disk as the extractors produce them."""
+
+    def write_rows(self, path, header, rows):
+        """A CSV with a header row (map veto, player stats, rounds)."""
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(header)
+            writer.writerows(rows)
+
+    def write_table(self, path, rows):
+        """A scraped HTML table, header included in `rows` (economy, performance)."""
+        # Same bytes pandas' DataFrame(rows).to_csv(index=False, header=False) wrote
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            csv.writer(file, lineterminator=os.linesep).writerows(_padded(rows))
+
+    def make_folders(self, folder, subfolders):
+        for subfolder in subfolders:
+            os.makedirs(os.path.join(folder, subfolder), exist_ok=True)
+
+    def finish_match(self, folder):
+        pass
+
+
+def _padded(rows):
+    """Rows as a table: every row as long as the longest, short ones filled with ''."""
+    rows = [['' if cell is None else cell for cell in row] for row in rows]
+    width = max((len(row) for row in rows), default=0)
+    return [row + [''] * (width - len(row)) for row in rows]
+
+
+class BundleSink:
+    """
+    Writes one file per match instead of a folder of CSVs: BUNDLE_NAME in the
+    match folder, gzip-compressed JSON mapping each table's CSV path relative
+    to the match folder ('player_stats/All_Maps.csv') to its rows, header
+    row first - the same cells the CSV would hold.
+    """
+
+    def __init__(self, level=BUNDLE_LEVEL):
+        self.level = level
+        self._tables = {}   # match folder -> {relative path: rows}
+        self._lock = Lock()
+
+    def _add(self, path, rows):
+        table_dir, filename = os.path.split(path)
+        folder, subfolder = os.path.split(table_dir)
+        with self._lock:
+            self._tables.setdefault(folder, {})[f"{subfolder}/{filename}"] = rows
+
+    def write_rows(self, path, header, rows):
+        self._add(path, [list(header)] + [list(row) for row in rows])
+
+    def write_table(self, path, rows):
+        self._add(path, _padded(rows))
+
+    def make_folders(self, folder, subfolders):
+        os.makedirs(folder, exist_ok=True)
+
+    def finish_match(self, folder):
+        with self._lock:
+            tables = self._tables.pop(folder, None)
+        if tables is not None:
+            write_bundle(folder, tables, self.level)
+
+
+class ArrowSink(BundleSink):
+    """
+    Collects a match's tables like BundleSink, then writes them typed: the
+    records pipeline/ingest_v2.py would parse out of the CSVs ("3 (1)"
+    becomes rounds_played=3, rounds_won=1), one zstd-compressed Arrow IPC
+    file (<kind>.arrow) per kind of table in the match folder. ingest_v2
+    loads them without parsing again. Needs pyarrow.
+
+    Arrow IPC rather than Parquet: these files are a few KB each, and
+    opening a Parquet file costs more than parsing the CSV it replaces.
+    """
+
+    def __init__(self):
+        super().__init__()
+        _typed_modules()  # fail at startup, not after the first match
+
+    def finish_match(self, folder):
+        with self._lock:
+            tables = self._tables.pop(folder, None)
+        if tables is not None:
+            write_typed(folder, tables)
+
+
+def _typed_modules():
+    """(pyarrow, ingest_v2) - the parsers are ingest's, so both sides agree on every column."""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise SystemExit("--format arrow needs pyarrow (pip install pyarrow)")
+    pipeline_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pipeline')
+    if pipeline_dir not in sys.path:
+        sys.path.append(pipeline_dir)
+    import ingest_v2
+    return pa, ingest_v2
+
+
+def write_typed(folder, tables):
+    """Writes a match's tables as typed Arrow files; returns their paths."""
+    pa, ingest = _typed_modules()
+    kinds = {}  # kind -> (table file names, records)
+    for relative_path, rows in sorted(tables.items()):
+        subfolder, name = relative_path.split('/', 1)
+        kind = ingest.table_kind(subfolder, name)
+        if kind is None:
+            continue
+        names, records = kinds.setdefault(kind, ([], []))
+        names.append(name)
+        records.extend({"file": name, **record}
+                       for record in ingest.parse_table(kind, ingest.BundleTable(name, rows)))
+
+    paths = []
+    for kind, (names, records) in kinds.items():
+        # Parsers leave out what a short row lacks, and from_pylist would only
+        # keep the first record's keys: build every column from all records
+        columns = dict.fromkeys(key for record in records for key in record)
+        table = pa.Table.from_pydict({column: [record.get(column) for record in records] for column in columns})
+        table = table.replace_schema_metadata({ingest.TYPED_FILES_KEY: json.dumps(names)})
+        path = os.path.join(folder, f"{kind}{ingest.TYPED_SUFFIX}")
+        options = pa.ipc.IpcWriteOptions(compression="zstd")
+        with pa.ipc.new_file(f"{path}.tmp", table.schema, options=options) as writer:
+            writer.write_table(table)
+        os.replace(f"{path}.tmp", path)
+        paths.append(path)
+    return paths
+
+
+def write_bundle(folder, tables, level=BUNDLE_LEVEL):
+    """Writes a match bundle atomically, so a crash never leaves half a file."""
+    path = os.path.join(folder, BUNDLE_NAME)
+    data = json.dumps({"version": BUNDLE_VERSION, "tables": dict(sorted(tables.items()))},
+                      ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as file:
+        file.write(gzip.compress(data, compresslevel=level, mtime=0))
+    os.replace(tmp, path)
+    return path
+
+
+def read_bundle(folder):
+    """{relative CSV path: rows} from a match folder's bundle."""
+    with gzip.open(os.path.join(folder, BUNDLE_NAME), 'rb') as file:
+        return json.loads(file.read())["tables"]
+
+
+class CollectSink:
+    """Records writes in order; `replay` performs them on another sink."""
+
+    def __init__(self):
+        self.writes = []    # (method name, args) - plain lists and strings, so they pickle
+
+    def write_rows(self, path, header, rows):
+        self.writes.append(('write_rows', (path, list(header), [list(row) for row in rows])))
+
+    def write_table(self, path, rows):
+        self.writes.append(('write_table', (path, [list(row) for row in rows])))
+
+    def make_folders(self, folder, subfolders):
+        self.writes.append(('make_folders', (folder, list(subfolders))))
+
+    def finish_match(self, folder):
+        self.writes.append(('finish_match', (folder,)))
+
+    def replay(self, sink):
+        for method, args in self.writes:
+            getattr(sink, method)(*args)
+        return len(self.writes)
+
+
+CSV_SINK = CsvSink()
+
+# Where the extractors write when not handed a sink (see configure_output)
+OUTPUT_SINK = CSV_SINK
+OUTPUT_FORMATS = {"csv": CsvSink, "bundle": BundleSink, "arrow": ArrowSink}
+
+# A match folder holding any of these has been scraped, whatever the format
+SCRAPED_MARKERS = (os.path.join('player_stats', 'All_Maps.csv'), BUNDLE_NAME, 'player_stats.arrow')
+
+
+def configure_output(output_format="csv"):
+    global OUTPUT_SINK
+    OUTPUT_SINK = CSV_SINK if output_format == "csv" else OUTPUT_FORMATS[output_format]()
+
+
+def add_output_args(parser):
+    """Adds --format to a scraper CLI."""
+    parser.add_argument('--format', dest='output_format', choices=list(OUTPUT_FORMATS), default="csv",
+                        help=f'csv: a folder of CSVs per match (default); bundle: one {BUNDLE_NAME} per match; '
+                             'arrow: typed tables, one .arrow file per kind of table (needs pyarrow)')
+
+
+def apply_output_args(args):
+    configure_output(args.output_format)
+
+
+# ---- converting and comparing layouts ----
+
+def _csv_tables(folder):
+    tables = {}
+    for subfolder in sorted(os.listdir(folder)):
+        table_dir = os.path.join(folder, subfolder)
+        if not os.path.isdir(table_dir):
+            continue
+        for filename in sorted(os.listdir(table_dir)):
+            if filename.endswith('.csv'):
+                with open(os.path.join(table_dir, filename), newline='', encoding='utf-8') as file:
+                    tables[f"{subfolder}/{filename}"] = list(csv.reader(file))
+    return tables
+
+
+def _layout_size(folder):
+    """(files, bytes) under a match folder."""
+    files = size = 0
+    for root, _, names in os.walk(folder):
+        for name in names:
+            if name == BUNDLE_NAME:
+                continue
+            files += 1
+            size += os.path.getsize(os.path.join(root, name))
+    return files, size
+
+
+def convert_tree(root, output_format="bundle", remove_csv=False):
+    """
+    Writes a bundle (or the typed files) next to the CSVs of every match
+    folder under `root` and prints how the layouts compare; with remove_csv
+    the CSVs are deleted.
+    """
+    matches = csv_files = csv_bytes = new_files = new_bytes = 0
+    for folder, dirs, names in os.walk(root):
+        if 'player_stats' not in dirs:
+            continue
+        tables = _csv_tables(folder)
+        files, size = _layout_size(folder)
+        paths = [write_bundle(folder, tables)] if output_format == "bundle" else write_typed(folder, tables)
+        new_files += len(paths)
+        new_bytes += sum(os.path.getsize(path) for path in paths)
+        matches += 1
+        csv_files += files
+        csv_bytes += size
+        if remove_csv:
+            for relative_path in tables:
+                os.remove(os.path.join(folder, relative_path))
+            for subfolder in {path.split('/')[0] for path in tables}:
+                if not os.listdir(os.path.join(folder, subfolder)):
+                    os.rmdir(os.path.join(folder, subfolder))
+        dirs.clear()
+    if matches:
+        print(f"{matches} matches: CSV {csv_files / matches:.1f} files and {csv_bytes / matches / 1024:.1f} KB "
+              f"per match; {output_format} {new_files / matches:.1f} files and {new_bytes / matches / 1024:.1f} KB "
+              f"per match ({csv_bytes / max(new_bytes, 1):.1f}x smaller)")
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert scraped CSV match folders to bundles or typed files.')
+    parser.add_argument('command', choices=['bundle', 'arrow'])
+    parser.add_argument('root', help='Directory to convert, e.g. "VCT Events"')
+    parser.add_argument('--remove-csv', action='store_true', help='Delete the CSVs once converted')
+    args = parser.parse_args()
+    convert_tree(args.root, args.command, args.remove_csv)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,45 +1,524 @@
+import os
+import asyncio
+import functools
 import requests
+import struct
+import tempfile
 import time
-from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from threading import Event, Lock
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+from http_cache import HttpCache
+from archive import PageArchive
+
+try:
+    import fcntl
+except ImportError:  # POSIX only; on Windows every process keeps its own budget
+    fcntl = None
 
 # Rate limiting configuration
-REQUEST_DELAY = 0.2  # 5 requests per second = 1 / 5 = 0.2s delay
-LAST_REQUEST_TIME = 0
-LOCK = Lock()
+REQUESTS_PER_SECOND = 5   # request budget shared by every fetch (in every process, see RATE_FILE)
+BURST = 1                 # requests allowed back-to-back before the rate applies
+CONCURRENCY = 4           # requests the async engine keeps in flight
+
+# Every scraper process on the machine draws from the budget kept in this file,
+# so running several of them at once still sends REQUESTS_PER_SECOND in total
+RATE_FILE = os.path.join(tempfile.gettempdir(), "vlrscrape-rate.state")
+SHARED_RATE = fcntl is not None
+
+# Adaptive rate control: the rate starts at REQUESTS_PER_SECOND, climbs by
+# RATE_STEP per healthy response up to MAX_RATE (None = REQUESTS_PER_SECOND)
+# and is multiplied by RATE_BACKOFF on a 429 or 5xx
+MAX_RATE = None
+MIN_RATE = 0.2
+RATE_STEP = 0.05
+RATE_BACKOFF = 0.5
+BACKOFF_WINDOW = 1.0      # seconds in which further errors don't cut the rate again
+MAX_RETRY_AFTER = 600     # longest Retry-After honoured, in seconds
+BREAKER_ERRORS = 5        # errors in a row that pause the whole crawl...
+BREAKER_PAUSE = 30        # ...for this many seconds, doubling while they continue...
+MAX_BREAKER_PAUSE = 600   # ...up to this
+IDLE_RESET = 60           # limiter state untouched this long starts over at REQUESTS_PER_SECOND
+RATE_LOG_EVERY = 100      # log the current rate every this many responses
+EVENT_STATS = {"cut": "cuts", "pause": "pauses", "breaker": "breaker"}  # rate control event -> stats key
+
+# Connection pooling configuration
+POOL_SIZE = 10            # keep-alive connections kept open to vlr.gg
+CONNECT_TIMEOUT = 5       # seconds to establish a connection
+READ_TIMEOUT = 30         # seconds to wait for the server between bytes
+
+# Response cache (see http_cache.py); None disables it
+DEFAULT_CACHE_DIR = ".http_cache"
+CACHE = None
+
+# Raw page archive for reparse.py (see archive.py); None disables it
+ARCHIVE = None
 
 HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    # Advertise every encoding urllib3 can decode (adds br/zstd when brotli/zstandard are installed)
+    "Accept-Encoding": make_headers(accept_encoding=True)["accept-encoding"],
 }
 
-def fetch_url(url, retries=3):
+_SESSION = None
+_SESSION_LOCK = Lock()
+_EXECUTOR = None
+
+# Single-flight: fetches of a URL already being fetched wait for that request
+_IN_FLIGHT = {}
+_IN_FLIGHT_LOCK = Lock()
+COALESCED = 0             # fetches answered by another caller's request
+
+
+class TokenBucket:
+    """
+    Thread-safe, adaptive rate limiter (a token bucket kept as GCRA state:
+    `tat` is when the next request would be due if requests had been sent
+    at exactly the current rate). Callers reserve the next free slot and
+    sleep until it is due, so the rate holds however many requests are in
+    flight; up to `capacity` requests may go back-to-back.
+
+    The rate itself follows the responses (AIMD): every healthy response
+    adds RATE_STEP req/s up to `max_rate`, a 429 or 5xx multiplies it by
+    RATE_BACKOFF (at most once per BACKOFF_WINDOW, so one burst of errors
+    from the requests in flight counts once). A Retry-After header pauses
+    every request, and BREAKER_ERRORS errors in a row open the circuit
+    breaker, which pauses the whole crawl for BREAKER_PAUSE seconds,
+    doubling while the errors continue.
+    """
+    _FIELDS = ("tat", "rate", "paused_until", "cut_at", "pause", "errors")
+
+    def __init__(self, rate, capacity=1, max_rate=None):
+        self.start_rate = rate
+        self.max_rate = max(max_rate or rate, rate)
+        self.capacity = capacity
+        self.rate = rate
+        self._state = self._fresh_state()
+        self._lock = Lock()
+        # what this process saw, for the crawl summary
+        self.stats = {"responses": 0, "errors": 0, "cuts": 0, "pauses": 0, "breaker": 0}
+
+    def _fresh_state(self):
+        return {"tat": 0.0, "rate": float(self.start_rate), "paused_until": 0.0,
+                "cut_at": 0.0, "pause": 0.0, "errors": 0}
+
+    def _clock(self):
+        return time.monotonic()
+
+    def _transaction(self, change):
+        """Runs change(state, now) atomically and returns its result."""
+        with self._lock:
+            now = self._clock()
+            self._check_idle(self._state, now)
+            result = change(self._state, now)
+            self.rate = self._state["rate"]
+        return result
+
+    def _check_idle(self, state, now):
+        # Left over from a crawl that has finished: start again from the configured rate
+        if max(state["tat"], state["paused_until"]) < now - IDLE_RESET:
+            state.update(self._fresh_state())
+        state["rate"] = min(max(state["rate"], MIN_RATE), self.max_rate)
+
+    def _reserve(self):
+        """Takes the next request slot and returns how long to wait for it."""
+        def take(state, now):
+            interval = 1.0 / state["rate"]
+            start = max(now, state["paused_until"], state["tat"] - (self.capacity - 1) * interval)
+            state["tat"] = max(state["tat"], start) + interval
+            return start - now
+        return self._transaction(take)
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def record(self, status, retry_after=None):
+        """
+        Feeds the outcome of a request into the rate control: its HTTP status,
+        or None if it failed without a response.
+        """
+        healthy = status is not None and status != 429 and status < 500
+
+        def update(state, now):
+            events = []
+            if healthy:
+                state["errors"] = 0
+                state["pause"] = 0.0
+                state["rate"] = min(self.max_rate, state["rate"] + RATE_STEP)
+                return events
+            state["errors"] += 1
+            if now - state["cut_at"] >= BACKOFF_WINDOW:
+                events.append(("cut", state["rate"]))
+                state["rate"] = max(MIN_RATE, state["rate"] * RATE_BACKOFF)
+                state["cut_at"] = now
+            if retry_after:
+                delay = min(retry_after, MAX_RETRY_AFTER)
+                state["paused_until"] = max(state["paused_until"], now + delay)
+                events.append(("pause", delay))
+            if state["errors"] >= BREAKER_ERRORS:
+                state["pause"] = min(MAX_BREAKER_PAUSE, state["pause"] * 2 or BREAKER_PAUSE)
+                state["paused_until"] = max(state["paused_until"], now + state["pause"])
+                state["errors"] = 0
+                events.append(("breaker", state["pause"]))
+            return events
+
+        events = self._transaction(update)
+        # Fetch threads record at the same time: count under the lock, print outside it
+        with self._lock:
+            self.stats["responses"] += 1
+            responses = self.stats["responses"]
+            if not healthy:
+                self.stats["errors"] += 1
+            for event, _ in events:
+                self.stats[EVENT_STATS[event]] += 1
+        for event, value in events:
+            if event == "cut":
+                print(f"Slowing down: {value:.2f} -> {self.rate:.2f} req/s")
+            elif event == "pause":
+                print(f"Retry-After: pausing all requests for {value:g}s")
+            else:
+                print(f"Circuit breaker open after {BREAKER_ERRORS} errors in a row: "
+                      f"pausing all requests for {value:g}s (rate {self.rate:.2f} req/s)")
+        if healthy and responses % RATE_LOG_EVERY == 0:
+            print(f"Rate: {self.rate:.2f} req/s")
+
+
+class SharedTokenBucket(TokenBucket):
+    """
+    The same limiter, kept in a file so that every process on the host shares
+    it - the schedule, the adaptive rate, pauses and the error count alike.
+    Each update is one read-modify-write of the file under an flock, so the
+    processes never need to talk to each other. Processes sharing a file
+    should use the same --rate and --max-rate.
+    """
+    _STATE = struct.Struct("<dddddI")
+
+    def __init__(self, path, rate, capacity=1, max_rate=None):
+        super().__init__(rate, capacity, max_rate)
+        self.path = path
+        self._fd = None
+
+    def _open(self):
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+        return self._fd
+
+    def _clock(self):
+        return time.time()  # comparable between processes
+
+    def _transaction(self, change):
+        with self._lock:  # flock doesn't exclude threads sharing one descriptor
+            fd = self._open()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                data = os.pread(fd, self._STATE.size, 0)
+                if data:
+                    state = dict(zip(self._FIELDS, self._STATE.unpack(data)))
+                else:  # new file
+                    state = self._fresh_state()
+                now = self._clock()
+                self._check_idle(state, now)
+                result = change(state, now)
+                os.pwrite(fd, self._STATE.pack(*(state[field] for field in self._FIELDS)), 0)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            self.rate = state["rate"]
+        return result
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def _make_limiter():
+    if SHARED_RATE and fcntl is not None:
+        return SharedTokenBucket(RATE_FILE, REQUESTS_PER_SECOND, BURST, MAX_RATE)
+    return TokenBucket(REQUESTS_PER_SECOND, BURST, MAX_RATE)
+
+
+RATE_LIMITER = _make_limiter()
+
+
+def configure_rate(rate=None, burst=None, concurrency=None, rate_file=None, shared=None, max_rate=None):
     """
-    Fetches a URL with rate limiting and retry logic.
+    Replaces the rate limiter and/or resizes the async fetch pool.
+    `rate` is where the adaptive rate starts and `max_rate` the most it may
+    climb to (default: `rate`). `shared` / `rate_file` choose between the
+    host-wide limiter (kept in rate_file) and a budget private to this process.
     """
-    global LAST_REQUEST_TIME
-    
-    with LOCK:
-        current_time = time.time()
-        elapsed = current_time - LAST_REQUEST_TIME
-        if elapsed < REQUEST_DELAY:
-            time.sleep(REQUEST_DELAY - elapsed)
-        LAST_REQUEST_TIME = time.time()
-    
+    global REQUESTS_PER_SECOND, BURST, CONCURRENCY, RATE_LIMITER, RATE_FILE, SHARED_RATE, MAX_RATE, _EXECUTOR
+    if rate is not None:
+        REQUESTS_PER_SECOND = rate
+    if burst is not None:
+        BURST = burst
+    if max_rate is not None:
+        MAX_RATE = max_rate
+    if rate_file is not None:
+        RATE_FILE = rate_file
+    if shared is not None:
+        SHARED_RATE = shared
+    if isinstance(RATE_LIMITER, SharedTokenBucket):
+        RATE_LIMITER.close()
+    RATE_LIMITER = _make_limiter()
+    if concurrency is not None and concurrency != CONCURRENCY:
+        CONCURRENCY = concurrency
+        if _EXECUTOR is not None:
+            _EXECUTOR.shutdown(wait=False)
+            _EXECUTOR = None
+
+
+def get_session():
+    """
+    Returns the process-wide requests.Session, creating it on first use.
+    The session keeps up to POOL_SIZE keep-alive connections per host and is
+    safe to share between threads (urllib3 pools are thread-safe; pool_block
+    makes extra threads wait for a free connection instead of opening one
+    that would be thrown away).
+    """
+    global _SESSION
+    if _SESSION is None:
+        with _SESSION_LOCK:
+            if _SESSION is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, pool_block=True)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update(HEADERS)
+                _SESSION = session
+    return _SESSION
+
+
+def configure_session(pool_size=None, timeout=None):
+    """
+    Updates pool size / read timeout. The current session is closed so the
+    next request builds one with the new settings.
+    """
+    global POOL_SIZE, READ_TIMEOUT, _SESSION
+    with _SESSION_LOCK:
+        if pool_size is not None:
+            POOL_SIZE = pool_size
+        if timeout is not None:
+            READ_TIMEOUT = timeout
+        if _SESSION is not None:
+            _SESSION.close()
+            _SESSION = None
+
+
+def configure_cache(cache_dir):
+    """Enables the on-disk response cache in `cache_dir`, or disables it when None."""
+    global CACHE
+    CACHE = HttpCache(cache_dir) if cache_dir else None
+
+
+def configure_archive(archive_dir):
+    """Keeps every fetched page in `archive_dir` for offline re-parsing, or stops when None."""
+    global ARCHIVE
+    ARCHIVE = PageArchive(archive_dir) if archive_dir else None
+
+
+def session_stats():
+    """
+    Returns connection counters for the shared session:
+    requests sent, connections opened and requests that reused a connection.
+    """
+    requests_sent = connections = 0
+    session = _SESSION
+    if session is not None:
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                requests_sent += pool.num_requests
+                connections += pool.num_connections
+    return {
+        "requests": requests_sent,
+        "connections": connections,
+        "reused": max(requests_sent - connections, 0),
+        "coalesced": COALESCED,
+    }
+
+
+def print_session_stats():
+    stats = session_stats()
+    print(f"HTTP: {stats['requests']} requests over {stats['connections']} connections "
+          f"({stats['reused']} reused), {stats['coalesced']} duplicate fetches coalesced")
+    limiter = RATE_LIMITER.stats
+    print(f"Rate: {RATE_LIMITER.rate:.2f} req/s at the end (max {RATE_LIMITER.max_rate:g}), "
+          f"{limiter['errors']} throttled/failed responses, {limiter['cuts']} slowdowns, "
+          f"{limiter['pauses']} Retry-After pauses, {limiter['breaker']} circuit breaker pauses")
+    if CACHE is not None:
+        cache_stats = CACHE.stats()
+        print(f"Cache: {cache_stats['hits']} hits, {cache_stats['revalidated']} revalidated, "
+              f"{cache_stats['misses']} misses, {cache_stats['bytes_saved'] / 1e6:.1f} MB saved")
+
+
+def add_http_args(parser):
+    """Adds the shared HTTP options to a scraper CLI."""
+    parser.add_argument('--rate', type=float, default=REQUESTS_PER_SECOND,
+                        help='Requests per second across the whole crawl; the rate adapts to 429s and server '
+                             f'errors from here (default: {REQUESTS_PER_SECOND})')
+    parser.add_argument('--max-rate', type=float, default=MAX_RATE,
+                        help='Highest rate to climb to while responses are healthy (default: --rate)')
+    parser.add_argument('--rate-file', default=RATE_FILE,
+                        help='File holding the request budget shared by every scraper process on this machine '
+                             f'(default: {RATE_FILE})')
+    parser.add_argument('--private-rate', action='store_true',
+                        help="Don't share the request budget with other scraper processes")
+    parser.add_argument('--concurrency', '--fetch-workers', dest='concurrency', type=int, default=CONCURRENCY,
+                        help=f'Fetch threads, i.e. requests kept in flight (default: {CONCURRENCY})')
+    parser.add_argument('--pool-size', type=int, default=POOL_SIZE,
+                        help=f'Keep-alive connections to keep open (default: {POOL_SIZE})')
+    parser.add_argument('--timeout', type=float, default=READ_TIMEOUT,
+                        help=f'Per-request read timeout in seconds (default: {READ_TIMEOUT})')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help=f'On-disk response cache directory (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always download pages, bypassing the response cache')
+    parser.add_argument('--archive', metavar='DIR',
+                        help='Also keep every fetched page in DIR so reparse.py can rebuild the CSVs offline')
+
+
+def apply_http_args(args):
+    """Applies the options added by add_http_args."""
+    configure_session(pool_size=max(args.pool_size, args.concurrency), timeout=args.timeout)
+    configure_rate(rate=args.rate, concurrency=args.concurrency, rate_file=args.rate_file,
+                   shared=not args.private_rate, max_rate=args.max_rate)
+    configure_cache(None if args.no_cache else args.cache_dir)
+    configure_archive(args.archive)
+
+
+class _Flight:
+    """A fetch in progress that other callers can wait on."""
+
+    def __init__(self):
+        self.done = Event()
+        self.response = None
+        self.error = None
+
+
+def fetch_url(url, retries=3, timeout=None):
+    """
+    Fetches a URL with adaptive rate limiting (see TokenBucket) and retry logic.
+    Pages still fresh in CACHE are returned without a request. Calls for a
+    URL that another thread is already fetching wait for that fetch and get
+    the same response (treat it as read-only).
+    """
+    global COALESCED
+    with _IN_FLIGHT_LOCK:
+        flight = _IN_FLIGHT.get(url)
+        leader = flight is None
+        if leader:
+            flight = _IN_FLIGHT[url] = _Flight()
+        else:
+            COALESCED += 1
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.response
+
+    try:
+        flight.response = _fetch_and_archive(url, retries, timeout)
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        with _IN_FLIGHT_LOCK:
+            del _IN_FLIGHT[url]
+        flight.done.set()
+    return flight.response
+
+
+def _fetch_and_archive(url, retries, timeout):
+    response = _fetch_url(url, retries, timeout)
+    archive = ARCHIVE
+    if archive is not None and response is not None and response.status_code == 200:
+        archive.store(url, response)
+    return response
+
+
+def _fetch_url(url, retries, timeout):
+    cache = CACHE
+    cached = cache.lookup(url) if cache is not None else None
+    if cached is not None and cache.is_fresh(cached):
+        cache.record_hit(cached)
+        return cache.to_response(url, cached)
+    conditional_headers = cache.validators(cached) if cached is not None else {}
+
+    session = get_session()
+    if timeout is None:
+        timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
     for attempt in range(retries):
+        RATE_LIMITER.acquire()
         try:
-            response = requests.get(url, headers=HEADERS)
-            if response.status_code == 200:
-                return response
-            elif response.status_code == 429:
-                print(f"Rate limited (429). Waiting longer... (Attempt {attempt+1}/{retries})")
-                time.sleep(2 * (attempt + 1)) # Exponential backoffish
-            else:
-                print(f"Failed to fetch {url}. Status: {response.status_code}")
-                # Don't retry on 404
-                if response.status_code == 404:
-                    return response
+            response = session.get(url, timeout=timeout, headers=conditional_headers)
         except requests.RequestException as e:
             print(f"Request exception: {e}")
-            
+            RATE_LIMITER.record(None)
+            time.sleep(1) # Wait a bit before retry
+            continue
+
+        RATE_LIMITER.record(response.status_code, _retry_after(response))
+        if response.status_code == 200:
+            if cache is not None:
+                cache.store(url, response)
+            return response
+        elif response.status_code == 304 and cached is not None:
+            cache.record_not_modified(url, cached)
+            return cache.to_response(url, cached)
+        elif response.status_code == 429:
+            # The limiter has slowed every fetch down (and paused them for any Retry-After)
+            print(f"Rate limited (429), now {RATE_LIMITER.rate:.2f} req/s (Attempt {attempt+1}/{retries})")
+            continue
+        print(f"Failed to fetch {url}. Status: {response.status_code}")
+        # Don't retry on 404
+        if response.status_code == 404:
+            return response
         time.sleep(1) # Wait a bit before retry
-        
+
     return None
+
+
+def _retry_after(response):
+    """Seconds asked for by a Retry-After header (delay or HTTP date), or None."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _get_executor():
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        with _SESSION_LOCK:
+            if _EXECUTOR is None:
+                _EXECUTOR = ThreadPoolExecutor(max_workers=CONCURRENCY, thread_name_prefix="fetch")
+    return _EXECUTOR
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Runs a blocking scraper function (anything that calls fetch_url) on the
+    fetch thread pool. The pool has CONCURRENCY threads, which bounds the
+    requests in flight; RATE_LIMITER bounds how fast they start.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(func, *args, **kwargs))
+
+
+async def fetch_url_async(url, retries=3, timeout=None):
+    """Async counterpart of fetch_url."""
+    return await run_blocking(fetch_url, url, retries, timeout)
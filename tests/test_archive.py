@@ -0,0 +1,30 @@
+import os
+
+import archive
+from archive import PageArchive, compact
+
+
+def page(n):
+    return (f"<html><body><table>match {n}</table>" + "<div class='nav'>vlr</div>" * (20 + n % 7)).encode()
+
+
+def test_compact_switches_generation_and_keeps_every_page(tmp_path):
+    archive_dir = str(tmp_path / "archive")
+    writer = PageArchive(archive_dir)
+    for n in range(archive.TRAIN_AFTER + 4):
+        writer.store_body(f"https://www.vlr.gg/{n}/m", page(n))
+    writer.store_body("https://www.vlr.gg/0/m", page(100))  # newer copy replaces the first
+    writer.record_match("https://www.vlr.gg/0/m", "2024/Event/Stage")
+
+    assert compact(archive_dir) == archive.TRAIN_AFTER + 4
+    assert sorted(os.listdir(archive_dir)) == ["CURRENT", "gen-1", "lock"]
+
+    # The writer opened before the compaction follows it into the new generation
+    writer.store_body("https://www.vlr.gg/999/m", page(999))
+    reader = PageArchive(archive_dir)
+    index = reader.index()
+    assert reader.read(index["https://www.vlr.gg/0/m"]) == page(100)
+    assert reader.read(index["https://www.vlr.gg/5/m"]) == page(5)
+    assert reader.read(index["https://www.vlr.gg/999/m"]) == page(999)
+    assert reader.matches() == [("https://www.vlr.gg/0/m", "2024/Event/Stage")]
+    assert {entry['dict'] for entry in index.values()} == {index["https://www.vlr.gg/5/m"]['dict']}
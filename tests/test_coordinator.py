@@ -0,0 +1,77 @@
+import asyncio
+import threading
+
+import pytest
+import requests
+
+import parse_pool
+import scrape_global
+from coordinator import RemoteFrontier, make_server
+from frontier import Frontier, FAILED
+
+MATCH_URL = "https://www.vlr.gg/1001/a-vs-b"
+
+
+@pytest.fixture
+def coordinator(tmp_path):
+    """Starts a coordinator in a thread; yields a function that serves a frontier with an optional token."""
+    servers = []
+
+    def start(token=None):
+        frontier = Frontier(str(tmp_path / "frontier.db"))
+        server = make_server(frontier, "127.0.0.1", 0, token=token)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append((server, frontier))
+        return frontier, f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server, frontier in servers:
+        server.shutdown()
+        server.server_close()
+        frontier.close()
+
+
+def test_remote_call_with_kwargs(coordinator):
+    frontier, url = coordinator()
+    frontier.discover(MATCH_URL, "Group_Stage")
+    remote = RemoteFrontier(url)
+    try:
+        remote.mark_failed(MATCH_URL, "match page could not be fetched", attempt=True)
+        row = frontier.get(MATCH_URL)
+        assert row['state'] == FAILED
+        assert row['attempts'] == 1
+        assert row['last_error'] == "match page could not be fetched"
+        assert remote.counts() == {FAILED: 1}
+    finally:
+        remote.close()
+
+
+def test_pool_error_reaches_the_coordinator(coordinator, monkeypatch):
+    class BrokenPool:
+        async def process_match(self, *args, **kwargs):
+            raise RuntimeError("pool worker died")
+
+    frontier, url = coordinator()
+    frontier.discover(MATCH_URL, "Group_Stage")
+    remote = RemoteFrontier(url)
+    monkeypatch.setattr(parse_pool, "POOL", BrokenPool())
+    pipeline = scrape_global.CrawlPipeline(frontier=remote)
+    try:
+        with pytest.raises(RuntimeError, match="pool worker died"):
+            asyncio.run(pipeline.handle_match((MATCH_URL, "Group_Stage")))
+        row = frontier.get(MATCH_URL)
+        assert (row['state'], row['attempts'], row['last_error']) == (FAILED, 1, "pool worker died")
+    finally:
+        remote.close()
+
+
+def test_token_is_required_when_set(coordinator):
+    frontier, url = coordinator(token="secret")
+    anonymous, remote = RemoteFrontier(url), RemoteFrontier(url, token="secret")
+    try:
+        with pytest.raises(requests.HTTPError):
+            anonymous.counts()
+        assert remote.counts() == {}
+    finally:
+        anonymous.close()
+        remote.close()
@@ -0,0 +1,97 @@
+from frontier import Frontier, MAX_ATTEMPTS, DISCOVERED, EXTRACTED, FAILED, LIVE, COMPLETED
+
+MATCH_URL = "https://www.vlr.gg/1001/a-vs-b"
+OTHER_URL = "https://www.vlr.gg/1002/c-vs-d"
+
+
+def make_frontier(tmp_path):
+    return Frontier(str(tmp_path / "frontier.db"))
+
+
+def test_pending_lists_unfinished_matches_in_discovery_order(tmp_path):
+    frontier = make_frontier(tmp_path)
+    try:
+        frontier.discover(MATCH_URL, "2024/Event/Group_Stage")
+        frontier.discover(OTHER_URL, "2024/Event/Playoffs")
+        frontier.mark_fetched(MATCH_URL, "out")
+        assert frontier.pending() == [(MATCH_URL, "2024/Event/Group_Stage"), (OTHER_URL, "2024/Event/Playoffs")]
+
+        frontier.mark_extracted(MATCH_URL)
+        assert frontier.pending() == [(OTHER_URL, "2024/Event/Playoffs")]
+    finally:
+        frontier.close()
+
+
+def test_failed_attempts_stop_resume_and_lease(tmp_path):
+    frontier = make_frontier(tmp_path)
+    try:
+        frontier.discover(MATCH_URL, "Group_Stage")
+        for _ in range(MAX_ATTEMPTS - 1):
+            frontier.mark_failed(MATCH_URL, "timeout", attempt=True)
+        # An error that isn't an attempt (nor a successful fetch) doesn't count
+        frontier.mark_failed(MATCH_URL, "extractor", attempt=False)
+        frontier.mark_fetched(MATCH_URL, "out")
+        assert frontier.pending() == [(MATCH_URL, "Group_Stage")]
+
+        frontier.mark_failed(MATCH_URL, "timeout", attempt=True)
+        row = frontier.get(MATCH_URL)
+        assert (row['state'], row['attempts'], row['last_error']) == (FAILED, MAX_ATTEMPTS, "timeout")
+        assert frontier.pending() == []
+        assert frontier.lease("w1", limit=5) == []
+    finally:
+        frontier.close()
+
+
+def test_reopened_live_match_can_be_leased_again(tmp_path):
+    frontier = make_frontier(tmp_path)
+    try:
+        frontier.discover(MATCH_URL, "Group_Stage")
+        for _ in range(MAX_ATTEMPTS + 1):
+            assert frontier.lease("w1") == [(MATCH_URL, "Group_Stage")]
+            frontier.mark_fetched(MATCH_URL, "out", LIVE)
+            frontier.mark_extracted(MATCH_URL, "out", LIVE)
+            assert not frontier.is_immutable(MATCH_URL)
+            frontier.reopen(MATCH_URL)
+            assert frontier.get(MATCH_URL)['state'] == DISCOVERED
+        assert frontier.pending() == [(MATCH_URL, "Group_Stage")]
+        assert frontier.lease("w1") == [(MATCH_URL, "Group_Stage")]
+    finally:
+        frontier.close()
+
+
+def test_lease_is_exclusive_until_it_expires_or_ends(tmp_path):
+    frontier = make_frontier(tmp_path)
+    try:
+        frontier.discover(MATCH_URL, "Group_Stage")
+        frontier.discover(OTHER_URL, "Group_Stage")
+        assert frontier.lease("w1", limit=1) == [(MATCH_URL, "Group_Stage")]
+        assert frontier.lease("w2", limit=5) == [(OTHER_URL, "Group_Stage")]
+        assert frontier.lease("w3", limit=5) == []
+        assert frontier.leased() == 2
+
+        # A failure ends the lease, so the match is handed out again
+        frontier.mark_failed(MATCH_URL, "timeout", attempt=True)
+        assert frontier.lease("w3", limit=5) == [(MATCH_URL, "Group_Stage")]
+
+        # An expired lease is handed out again; an extracted match never is
+        frontier.mark_extracted(MATCH_URL, "out", COMPLETED)
+        assert frontier.get(MATCH_URL)['state'] == EXTRACTED
+        frontier._execute("UPDATE matches SET lease_expires = 0 WHERE match_id = '1002'")
+        assert frontier.lease("w4", limit=5) == [(OTHER_URL, "Group_Stage")]
+    finally:
+        frontier.close()
+
+
+def test_renew_keeps_a_lease_from_expiring(tmp_path):
+    frontier = make_frontier(tmp_path)
+    try:
+        frontier.discover(MATCH_URL, "Group_Stage")
+        frontier.discover(OTHER_URL, "Group_Stage")
+        assert frontier.lease("w1", limit=2, lease_seconds=-1) == [(MATCH_URL, "Group_Stage"),
+                                                                   (OTHER_URL, "Group_Stage")]
+        frontier.mark_extracted(OTHER_URL)
+        frontier.renew("w1")
+        assert frontier.lease("w2", limit=5) == []
+        assert frontier.leased() == 1
+    finally:
+        frontier.close()
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import parse_pool
+import scrape_global
+import utils
+from frontier import Frontier, FAILED
+
+MATCH_URL = "https://www.vlr.gg/1001/a-vs-b"
+
+
+def test_failing_extractor_keeps_the_other_tables(monkeypatch, tmp_path):
+    def veto(match_url, folder, memo, sink):
+        sink.write_rows(f"{folder}/veto.csv", ["map"], [["Ascent"]])
+
+    def stats(match_url, folder, memo, sink):
+        raise ValueError("no stats table")
+
+    monkeypatch.setattr(parse_pool, "create_folder_structure", lambda url, base, memo, sink: str(tmp_path))
+    monkeypatch.setattr(parse_pool, "match_status", lambda soup: "completed")
+    monkeypatch.setattr(parse_pool, "MATCH_EXTRACTORS", [("stats", "Player Stats", stats), ("veto", "Map Veto", veto)])
+    result = parse_pool._extract(MATCH_URL, {MATCH_URL: (200, b"<html></html>", "utf-8")}, None, ())
+
+    assert result['errors'] == ["Player Stats: no stats table"]
+    assert [method for method, _ in result['writes'].writes] == ['write_rows', 'finish_match']
+
+
+def test_pool_error_is_recorded_in_the_frontier(monkeypatch, tmp_path):
+    class BrokenPool:
+        async def process_match(self, *args, **kwargs):
+            raise RuntimeError("pool worker died")
+
+    frontier = Frontier(str(tmp_path / "frontier.db"))
+    frontier.discover(MATCH_URL, "Group_Stage")
+    monkeypatch.setattr(parse_pool, "POOL", BrokenPool())
+    pipeline = scrape_global.CrawlPipeline(frontier=frontier)
+    try:
+        with pytest.raises(RuntimeError):
+            asyncio.run(pipeline.handle_match((MATCH_URL, str(tmp_path))))
+        row = frontier.get(MATCH_URL)
+        assert row['state'] == FAILED
+        assert row['attempts'] == 1
+    finally:
+        frontier.close()
+
+
+def test_report_counts_only_time_spent_in_the_workers(monkeypatch):
+    class SlowMemo:
+        def get_response(self, url):
+            time.sleep(0.05)
+            return None
+
+    class Writes:
+        def replay(self, sink):
+            writer_threads.append(threading.current_thread().name)
+            return 1
+
+    writer_threads = []
+    fetch_threads = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fetch")
+    monkeypatch.setattr(utils, "CONCURRENCY", 1)
+    monkeypatch.setattr(utils, "_EXECUTOR", fetch_threads)
+    pool = parse_pool.ParsePool(1)
+
+    async def run():
+        await pool._fetch_pages(SlowMemo(), [f"{MATCH_URL}/?page={i}" for i in range(4)], {})
+        await pool._write(Writes())
+
+    try:
+        asyncio.run(run())
+    finally:
+        pool.close()
+        fetch_threads.shutdown()
+    # Four 50 ms fetches queued on one thread; counting the wait as well would add up to 0.5 s
+    assert pool.items["fetch"] == 4
+    assert pool.busy["fetch"] < 0.35
+    assert pool.items["write"] == 1
+    assert writer_threads[0].startswith("writer")
@@ -0,0 +1,40 @@
+import os
+
+import pytest
+from requests.models import Response
+
+import parsing
+from pages import PageMemo
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "match")
+EXPECTED_DIR = os.path.join(FIXTURE_DIR, "expected")
+
+
+def fixture_memo():
+    """A PageMemo serving the fixture match, economy and performance pages."""
+    def fetch(url):
+        if "tab=economy" in url:
+            name = "economy.html"
+        elif "tab=performance" in url:
+            name = "performance.html"
+        else:
+            name = "match.html"
+        with open(os.path.join(FIXTURE_DIR, name), "rb") as f:
+            response = Response()
+            response.status_code = 200
+            response.url = url
+            response._content = f.read()
+            response.encoding = "utf-8"
+        return response
+
+    return PageMemo(fetch=fetch)
+
+
+@pytest.mark.parametrize("targeted", [False, True], ids=["full-parse", "targeted"])
+@pytest.mark.parametrize("backend", parsing.available_backends())
+def test_extractors_output_matches_pinned_csvs(backend, targeted, monkeypatch, tmp_path):
+    monkeypatch.setattr(parsing, "PARSER", backend)
+    monkeypatch.setattr(parsing, "TARGETED_PARSE", targeted)
+    parsing._extract_all(None, str(tmp_path), fixture_memo())
+
+    assert parsing._diff_trees(EXPECTED_DIR, str(tmp_path)) == []
@@ -0,0 +1,75 @@
+import asyncio
+from types import SimpleNamespace
+
+import scrape_global
+from frontier import Frontier, COMPLETED
+
+EVENT_URL = "https://www.vlr.gg/event/100/test-event"
+LISTING_HTML = """
+<a class="event-item" href="/event/100/test-event">
+  <div class="event-item-title">Test Event</div>
+  <span class="event-item-desc-item-status mod-completed">completed</span>
+</a>
+"""
+STAGES = [("Group_Stage", "https://www.vlr.gg/event/matches/100/?series_id=1"),
+          ("Playoffs", "https://www.vlr.gg/event/matches/100/?series_id=2")]
+STAGE_MATCHES = {
+    STAGES[0][1]: ["https://www.vlr.gg/1001/a-vs-b"],
+    STAGES[1][1]: ["https://www.vlr.gg/1002/c-vs-d"],
+}
+
+
+def crawl(monkeypatch, frontier, event_folder, failing_stages):
+    """Runs the pipeline over one listing page with the given stage pages failing to load."""
+    async def fetch_listing(url):
+        return SimpleNamespace(text=LISTING_HTML)
+
+    async def discover_event(event_url, memo=None):
+        return event_folder, STAGES
+
+    def stage_matches(stage_url):
+        return None if stage_url in failing_stages else STAGE_MATCHES[stage_url]
+
+    monkeypatch.setattr(scrape_global, "fetch_url_async", fetch_listing)
+    monkeypatch.setattr(scrape_global, "discover_event_async", discover_event)
+    monkeypatch.setattr(scrape_global, "get_stage_matches", stage_matches)
+    pipeline = scrape_global.CrawlPipeline(frontier=frontier)
+    asyncio.run(pipeline.run([1]))
+    return pipeline
+
+
+def test_event_not_finished_when_a_stage_page_fails_once(monkeypatch, tmp_path):
+    frontier = Frontier(str(tmp_path / "frontier.db"))
+    # Both matches were extracted by an earlier crawl and are final
+    for stage_name, stage_url in STAGES:
+        for url in STAGE_MATCHES[stage_url]:
+            frontier.discover(url, stage_name, EVENT_URL)
+            frontier.mark_extracted(url, stage_name, COMPLETED)
+    event_folder = str(tmp_path / "VCT Events" / "2024" / "Test_Event")
+    try:
+        crawl(monkeypatch, frontier, event_folder, failing_stages={STAGES[1][1]})
+        assert not frontier.is_event_done(EVENT_URL)
+
+        pipeline = crawl(monkeypatch, frontier, event_folder, failing_stages=set())
+        assert pipeline.skipped == 2
+        assert frontier.is_event_done(EVENT_URL)
+    finally:
+        frontier.close()
+
+
+def test_worker_heartbeat_renews_its_leases(tmp_path):
+    frontier = Frontier(str(tmp_path / "frontier.db"))
+    frontier.discover("https://www.vlr.gg/1001/a-vs-b", "Group_Stage")
+    frontier.lease("w1", lease_seconds=-1)
+    pipeline = scrape_global.CrawlPipeline(frontier=frontier)
+
+    async def beat():
+        heartbeat = asyncio.create_task(pipeline.renew_leases("w1", every=0.01))
+        await asyncio.sleep(0.1)
+        heartbeat.cancel()
+
+    try:
+        asyncio.run(beat())
+        assert frontier.lease("w2") == []
+    finally:
+        frontier.close()
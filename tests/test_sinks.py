@@ -0,0 +1,23 @@
+import pytest
+
+import sinks
+
+pytest.importorskip("pyarrow")
+
+ADVANCED_STATS = [
+    ["", "", "2K", "3K", "4K", "5K", "1v1", "1v2", "1v3", "1v4", "1v5", "ECON", "PL", "DE"],
+    ["aspas MIBR", "", "5", "1"],
+    ["Less LOUD", "", "3", "0", "1", "0", "2", "1", "0", "0", "0", "64", "1", "2"],
+]
+
+
+def test_typed_output_keeps_columns_a_short_first_row_lacks(tmp_path):
+    _, ingest = sinks._typed_modules()
+    tables = {"performance/Map1_advanced_stats.csv": ADVANCED_STATS}
+    sinks.write_typed(str(tmp_path), tables)
+
+    typed = ingest.load_typed_tables(tmp_path)["performance"]
+    expected = ingest.parse_table("advanced_stats", ingest.BundleTable("Map1_advanced_stats.csv", ADVANCED_STATS))
+    assert [table.name for table in typed] == ["Map1_advanced_stats.csv"]
+    assert typed[0].records == expected
+    assert typed[0].records[1]["econ"] == 64